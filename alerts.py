@@ -0,0 +1,157 @@
+"""
+Low-attendance alerts behind data_manager.get_alerts.
+
+An AlertBook keeps running Present/Total counters per student for every
+batch, keyed by (roll_no, student_name) like the report, plus the students
+that currently break the alert rules. data_manager applies every saved
+session to it (taking back the session it replaced, if any) and re-checks
+only the students in that session, so a save costs time proportional to the
+session rather than a report. The book is stored in data_manager.ALERTS_FILE,
+so the app and cli.py read the alerts without touching the attendance data;
+a save only appends the counters it changed (see counts_json) to a journal.
+
+Rules: a student is flagged once they have at least 'min_sessions' marked
+sessions and their Percent (as in the report) is below 'threshold'.
+"""
+from lazy_import import lazy_module
+
+pd = lazy_module('pandas')
+
+DEFAULT_RULES = {'threshold': 75.0, 'min_sessions': 5}
+
+
+def _status_counts(df):
+    """{(roll_no, student_name): [present, total]} of session rows, first status per student."""
+    df = df.assign(roll_no=df['roll_no'].astype(str)).drop_duplicates(subset=['roll_no', 'student_name'], keep='first')
+    counts = {}
+    for roll_no, student_name, status in zip(df['roll_no'], df['student_name'], df['status']):
+        if status in ('Present', 'Absent'):
+            counts[(roll_no, student_name)] = [int(status == 'Present'), 1]
+    return counts
+
+
+class AlertBook:
+    """
+    Counters and alerts of every batch. 'versions' maps each batch to the
+    data version its counters were computed from; data_manager owns those
+    values and uses them to tell whether a batch has to be recounted.
+    """
+    def __init__(self, rules=None):
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.roster_version = None
+        self.versions = {}  # {batch: data version}
+        self._counts = {}   # {batch: {(roll_no, student_name): [present, total]}}
+        self._alerts = {}   # {batch: {(roll_no, student_name): alert dict}}
+        self._roster = {}   # {batch: set of (roll_no, student_name)}, None = everyone
+
+    # --- Counting ---
+
+    def set_counts(self, batch_name, counts, version):
+        """Replaces the counters of a batch with {(roll_no, student_name): (present, total)}."""
+        self._counts[batch_name] = {key: [int(present), int(total)] for key, (present, total) in counts.items()}
+        self.versions[batch_name] = version
+        self.evaluate(batch_name)
+
+    def apply_session(self, batch_name, rows, old_rows=None):
+        """
+        Adds one saved session (DataFrame with roll_no/student_name/status)
+        to the counters of a batch, taking back old_rows, the session it
+        replaced. Only the students in either session are re-checked; returns
+        their keys.
+        """
+        counts = self._counts.setdefault(batch_name, {})
+        touched = set()
+        for sign, df in ((-1, old_rows), (1, rows)):
+            if df is None:
+                continue
+            for key, (present, total) in _status_counts(df).items():
+                entry = counts.setdefault(key, [0, 0])
+                entry[0] += sign * present
+                entry[1] += sign * total
+                touched.add(key)
+        self.evaluate(batch_name, touched)
+        return touched
+
+    def forget_batch(self, batch_name):
+        for table in (self.versions, self._counts, self._alerts, self._roster):
+            table.pop(batch_name, None)
+
+    # --- Rules ---
+
+    def set_roster(self, batch_name, students):
+        """Limits the alerts of a batch to these (roll_no, student_name) keys, like the report."""
+        self._roster[batch_name] = None if students is None else set(students)
+        self.evaluate(batch_name)
+
+    def set_rules(self, **rules):
+        self.rules.update(rules)
+        for batch_name in self._counts:
+            self.evaluate(batch_name)
+
+    def evaluate(self, batch_name, keys=None):
+        """Re-checks the rules for some students of a batch (default: all of them)."""
+        counts = self._counts.get(batch_name, {})
+        alerts = self._alerts.setdefault(batch_name, {})
+        roster = self._roster.get(batch_name)
+        if keys is None:
+            alerts.clear()
+            keys = counts
+        for key in keys:
+            present, total = counts.get(key, (0, 0))
+            percent = round(present / total * 100, 1) if total else 0.0
+            if (total >= self.rules['min_sessions'] and percent < self.rules['threshold']
+                    and (roster is None or key in roster)):
+                alerts[key] = {'batch': batch_name, 'roll_no': key[0], 'student_name': key[1],
+                               'present': present, 'total': total, 'percent': percent}
+            else:
+                alerts.pop(key, None)
+
+    def alerts(self, batch_name=None):
+        """Alert dicts of one batch (or of all), lowest percent first."""
+        batches = self._alerts if batch_name is None else [batch_name]
+        found = [alert for b in batches for alert in self._alerts.get(b, {}).values()]
+        return sorted(found, key=lambda a: (a['percent'], a['batch'], a['roll_no']))
+
+    # --- Persistence ---
+
+    def to_json(self):
+        return {
+            'rules': self.rules,
+            'roster_version': self.roster_version,
+            'batches': {
+                batch_name: {
+                    'version': self.versions.get(batch_name),
+                    'counts': [[roll_no, name, present, total]
+                               for (roll_no, name), (present, total) in counts.items()],
+                    'roster': None if self._roster.get(batch_name) is None
+                              else sorted(self._roster[batch_name]),
+                }
+                for batch_name, counts in self._counts.items()
+            },
+        }
+
+    def counts_json(self, batch_name, keys):
+        """The counters of some students of a batch, as [roll_no, name, present, total] rows."""
+        counts = self._counts.get(batch_name, {})
+        return [[roll_no, name] + counts[(roll_no, name)] for roll_no, name in keys if (roll_no, name) in counts]
+
+    def load_counts(self, batch_name, rows):
+        """Reverses counts_json: sets the counters of those students and re-checks them."""
+        counts = self._counts.setdefault(batch_name, {})
+        for roll_no, name, present, total in rows:
+            counts[(roll_no, name)] = [present, total]
+        self.evaluate(batch_name, [(roll_no, name) for roll_no, name, _, _ in rows])
+
+    @classmethod
+    def from_json(cls, data, version_from_json=lambda v: v):
+        """Reverses to_json; version_from_json turns stored versions back into their original form."""
+        book = cls(data.get('rules'))
+        book.roster_version = version_from_json(data.get('roster_version'))
+        for batch_name, entry in data.get('batches', {}).items():
+            book.versions[batch_name] = version_from_json(entry['version'])
+            book._counts[batch_name] = {(roll_no, name): [present, total]
+                                        for roll_no, name, present, total in entry['counts']}
+            roster = entry.get('roster')
+            book._roster[batch_name] = None if roster is None else {tuple(key) for key in roster}
+            book.evaluate(batch_name)
+        return book
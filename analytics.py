@@ -1,104 +1,522 @@
+import base64
+import io
+import os
+import threading
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
 import data_manager
+import instrument
+import report_export
+from lazy_import import lazy_module
+from tasks import TaskRunner
+
+# Imported on first use, so start-up does not wait for the scientific stack
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
 
 # Requires:
 # pip install matplotlib
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+# (imported inside the chart functions)
 
-def create_analytics_chart(parent_frame, batch_name):
-    """
-    Creates and embeds a grouped bar chart for attendance into a given parent frame.
-    """
-    import numpy as np
-    from matplotlib import ticker
+# Chart and report generation is split in two halves: the load_*/build_*
+# functions only touch data and matplotlib's Agg renderer, so they can run on
+# a worker thread (see tasks.TaskRunner); the show_* functions create the Tk
+# widgets and must run on the Tk main thread.
 
-    # Clear any previous widgets in the frame
+CHART_DPI = 140
+CHART_PADDING = 20 # Space kept free around the chart image, in pixels
+# Batches larger than this get the aggregated chart instead of one bar pair per student
+CHART_LARGE_BATCH = 40
+CHART_PAGE_SIZE = 30 # Students per page of bars in the large-batch chart
+CHART_TOP_N = 10     # Students shown at each end of the top/bottom ranking
+CHART_CACHE_SIZE = 32 # Rendered charts kept in memory (about 100-200 KB each)
+
+def _clear(parent_frame):
     for widget in parent_frame.winfo_children():
         widget.destroy()
 
-    df, msg = data_manager.get_report_data(batch_name)
-    if df is None or df.empty:
-        ttk.Label(parent_frame, text=msg, style="Header.TLabel").pack(pady=50)
-        return
+def show_loading(parent_frame, text):
+    """Replaces the frame's content with a busy indicator."""
+    _clear(parent_frame)
+    ttk.Label(parent_frame, text=text, style="Header.TLabel").pack(pady=(50, 10))
+    progress = ttk.Progressbar(parent_frame, mode="indeterminate", length=200)
+    progress.pack()
+    progress.start(10)
 
-    try:
-        # Ensure numeric columns
-        df['Present'] = pd.to_numeric(df['Present'], errors='coerce').fillna(0).astype(int)
-        df['Absent']  = pd.to_numeric(df['Absent'],  errors='coerce').fillna(0).astype(int)
+def show_error(parent_frame, text):
+    _clear(parent_frame)
+    ttk.Label(parent_frame, text=text, style="Header.TLabel").pack(pady=50)
+
+def _draw_grouped_bars(fig, df, title='Overall Attendance Summary'):
+    """Draws one Present/Absent bar pair per student of df onto fig."""
+    from matplotlib import ticker
+
+    n = len(df)
+    ax = fig.add_subplot(111)
+
+    indices = np.arange(n)
+    bar_width = 0.25  # Slightly reduced bar width for more space between bars
 
-        # Ensure 'Roll No.' column exists and is a string for label creation
-        df['Student'] = df['Roll No.'].astype(str) + " - " + df['Name'].astype(str)
+    # Bars with solid edge so each bar stands out
+    present_bars = ax.bar(indices - bar_width/2, df['Present'],
+                          width=bar_width, label='Present',
+                          color='#2B8CFF', edgecolor='black', linewidth=0.6)
+    absent_bars  = ax.bar(indices + bar_width/2, df['Absent'],
+                          width=bar_width, label='Absent',
+                          color='#FF4D4D', edgecolor='black', linewidth=0.6)
+
+    # Title & labels (slightly larger)
+    ax.set_title(title, fontsize=20, fontweight='bold', pad=16)
+    ax.set_xlabel('Students', fontsize=15, labelpad=12)
+    ax.set_ylabel('Number of Days', fontsize=15, labelpad=12)
+
+    # X ticks and smaller student name font
+    ax.set_xticks(indices)
+    # Use full student name for labels
+    label_fontsize = 9 if n <= 15 else 7   # smaller when many students
+    rotation = 30 if n <= 12 else 60
+    ax.set_xticklabels(df['Student'], rotation=rotation, ha='right', fontsize=label_fontsize)
+
+    # Y ticks readability
+    ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
+    ax.tick_params(axis='y', labelsize=12)
+    ax.tick_params(axis='x', labelsize=label_fontsize)
+
+    # Provide extra space at left/right of bars so they don't touch axis edges
+    ax.set_xlim(-0.7, n - 0.3) # Adjusted limits for more padding
+    ax.margins(x=0.02)
+
+    # Gridlines
+    ax.grid(axis='y', linestyle='--', alpha=0.45)
+
+    # Put legend above the chart (keeps plotting area spacious)
+    ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.09), ncol=2, fontsize=12, frameon=False) # Slightly higher legend
+
+    # Increase the margins around the plot area so labels & legend have room
+    fig.subplots_adjust(left=0.06, right=0.98, top=0.88, bottom=0.26) # Adjusted margins
+
+def _draw_overview(fig, df):
+    """Draws the aggregated view of a large batch: percent histogram plus top/bottom students."""
+    ax_hist, ax_rank = fig.subplots(1, 2, gridspec_kw={'width_ratios': [1, 1.3]})
+
+    # 1. How many students fall in each 10% attendance bucket
+    percents = pd.to_numeric(df['Percent'], errors='coerce').fillna(0)
+    counts, edges = np.histogram(percents, bins=np.arange(0, 101, 10))
+    labels = [f"{int(lo)}-{int(hi)}" for lo, hi in zip(edges[:-1], edges[1:])]
+    ax_hist.bar(np.arange(len(counts)), counts, color='#2B8CFF', edgecolor='black', linewidth=0.6)
+    ax_hist.set_xticks(np.arange(len(counts)))
+    ax_hist.set_xticklabels(labels, rotation=45, ha='right', fontsize=9)
+    ax_hist.set_title(f'Attendance % of {len(df)} Students', fontsize=14, fontweight='bold')
+    ax_hist.set_xlabel('Attendance %', fontsize=11)
+    ax_hist.set_ylabel('Students', fontsize=11)
+    ax_hist.grid(axis='y', linestyle='--', alpha=0.45)
+
+    # 2. Best and worst CHART_TOP_N students by attendance percent
+    ranked = df.assign(Percent=percents).sort_values('Percent', kind='stable')
+    top_n = min(CHART_TOP_N, len(ranked) // 2)
+    shown = pd.concat([ranked.head(top_n), ranked.tail(top_n)])
+    positions = np.arange(len(shown))
+    ax_rank.barh(positions, shown['Percent'],
+                 color=['#FF4D4D'] * top_n + ['#2B8CFF'] * top_n, edgecolor='black', linewidth=0.6)
+    ax_rank.set_yticks(positions)
+    ax_rank.set_yticklabels(shown['Student'], fontsize=8)
+    ax_rank.set_xlim(0, 100)
+    ax_rank.set_title(f'Bottom {top_n} (red) and Top {top_n} (blue)', fontsize=14, fontweight='bold')
+    ax_rank.set_xlabel('Attendance %', fontsize=11)
+    ax_rank.grid(axis='x', linestyle='--', alpha=0.45)
+
+    fig.subplots_adjust(left=0.06, right=0.98, top=0.9, bottom=0.18, wspace=0.45)
+
+def chart_page_count(n_students):
+    """Number of student pages in the large-batch chart mode, 0 for small batches."""
+    if n_students <= CHART_LARGE_BATCH:
+        return 0
+    return -(-n_students // CHART_PAGE_SIZE)
+
+def build_analytics_figure(df, size_px=None, page=None):
+    """
+    Builds the attendance chart for a report DataFrame.
 
-        n = len(df)
+    Small batches get the grouped Present/Absent bars of every student.
+    Batches above CHART_LARGE_BATCH students get a fixed-size overview
+    (page=None) or the grouped bars of one page of CHART_PAGE_SIZE students,
+    so the figure never grows with the batch.
+    size_px=(width, height) renders at that pixel size; by default the figure
+    widens with the number of students.
+    """
+    from matplotlib.figure import Figure
+
+    # Ensure numeric columns
+    df['Present'] = pd.to_numeric(df['Present'], errors='coerce').fillna(0).astype(int)
+    df['Absent']  = pd.to_numeric(df['Absent'],  errors='coerce').fillna(0).astype(int)
+
+    # Ensure 'Roll No.' column exists and is a string for label creation
+    df['Student'] = df['Roll No.'].astype(str) + " - " + df['Name'].astype(str)
+
+    n = len(df)
+    large = chart_page_count(n) > 0
+    if size_px:
+        # Fill the space the chart is shown in, like the old Tk canvas did
+        fig_w, fig_h = size_px[0] / CHART_DPI, size_px[1] / CHART_DPI
+    elif large:
+        fig_w, fig_h = 12, 9
+    else:
         # Figure size: widen when many students
         fig_w = max(12, n * 1.2)   # Increased multiplier for more space per student
         fig_h = 9                   # taller for more vertical space
-        fig = Figure(figsize=(fig_w, fig_h), dpi=140)
-        ax = fig.add_subplot(111)
+    fig = Figure(figsize=(fig_w, fig_h), dpi=CHART_DPI)
+
+    if not large:
+        _draw_grouped_bars(fig, df)
+    elif page is None:
+        _draw_overview(fig, df)
+    else:
+        start = page * CHART_PAGE_SIZE
+        page_df = df.iloc[start:start + CHART_PAGE_SIZE]
+        _draw_grouped_bars(fig, page_df, title=f'Students {start + 1}-{start + len(page_df)} of {n}')
+    return fig
+
+class ChartCache:
+    """
+    Bounded LRU cache of rendered charts, keyed by
+    (batch, data version, size, page). Safe to use from worker threads.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, batch_name=None):
+        """Drops the cached charts of one batch, or of every batch."""
+        with self._lock:
+            for key in list(self._entries):
+                if batch_name is None or key[0] == batch_name:
+                    del self._entries[key]
+
+chart_cache = ChartCache(CHART_CACHE_SIZE)
+# Saved attendance makes a batch's charts stale right away
+data_manager.add_save_listener(lambda batch_name, attendance_date: chart_cache.invalidate(batch_name))
+
+def render_figure_png(fig):
+    """Renders a figure with Agg and returns it as base64 PNG data for tk.PhotoImage."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=fig.dpi)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+def load_analytics_chart(batch_name, size_px=None, page=None):
+    """
+    Worker half of the chart tab: loads the report and renders the chart.
+    Returns (png_data, message, page_count, page); png_data is None if there
+    is nothing to show, page_count is 0 unless the batch is large, and page
+    is the one rendered: None (the overview) if the requested page no
+    longer exists.
+    Charts are reused from chart_cache while the batch's data is unchanged.
+    """
+    with instrument.span('chart.load', batch=batch_name, page=page) as sp:
+        key = (batch_name, data_manager.get_data_version(batch_name), size_px, page)
+        cached = chart_cache.get(key)
+        sp.set(cached=cached is not None)
+        if cached is not None:
+            return cached
+
+        df, msg = data_manager.get_report_data(batch_name)
+        if df is None or df.empty:
+            return None, msg, 0, None
+        try:
+            pages = chart_page_count(len(df))
+            if page is not None and not 0 <= page < pages:
+                page = None
+            with instrument.span('chart.figure', rows=len(df)):
+                fig = build_analytics_figure(df, size_px, page)
+            with instrument.span('chart.draw') as draw:
+                png_data = render_figure_png(fig)
+                draw.set(png_bytes=len(png_data))
+            result = (png_data, msg, pages, page)
+        except Exception as e:
+            return None, f"Could not generate chart: {e}", 0, None
+        chart_cache.put(key, result)
+        return result
+
+def show_analytics_chart(parent_frame, png_data, msg, pages=0, page=None, on_page=None):
+    """
+    Tk half of the chart tab: shows a chart rendered by load_analytics_chart.
+    For large batches a selector switches between the overview and the
+    student pages by calling on_page(page), page=None meaning the overview.
+    """
+    with instrument.span('chart.show', page=page):
+        _show_analytics_chart(parent_frame, png_data, msg, pages, page, on_page)
+
+def _show_analytics_chart(parent_frame, png_data, msg, pages, page, on_page):
+    _clear(parent_frame)
+    if png_data is None:
+        ttk.Label(parent_frame, text=msg, style="Header.TLabel").pack(pady=50)
+        return
+
+    if pages and on_page is not None:
+        nav = ttk.Frame(parent_frame)
+        nav.pack(fill="x", padx=CHART_PADDING, pady=(10, 0))
+        choices = ["Overview"] + [f"Students {i * CHART_PAGE_SIZE + 1}-{(i + 1) * CHART_PAGE_SIZE}"
+                                  for i in range(pages)]
+        selector = ttk.Combobox(nav, values=choices, state="readonly", width=20)
+        selector.current(0 if page is None else page + 1)
+        selector.bind("<<ComboboxSelected>>",
+                      lambda e: on_page(None if selector.current() == 0 else selector.current() - 1))
+        ttk.Label(nav, text="Show:").pack(side="left")
+        selector.pack(side="left", padx=5)
+        if page is not None:
+            ttk.Button(nav, text="Next >", state="normal" if page + 1 < pages else "disabled",
+                       command=lambda: on_page(page + 1)).pack(side="right")
+            ttk.Button(nav, text="< Previous",
+                       command=lambda: on_page(page - 1 if page > 0 else None)).pack(side="right", padx=5)
+
+    image = tk.PhotoImage(data=png_data)
+    label = ttk.Label(parent_frame, image=image)
+    label.image = image # Keep a reference, Tk does not
+    label.pack(side=tk.TOP, fill=tk.BOTH, expand=1, padx=CHART_PADDING, pady=CHART_PADDING)
 
-        indices = np.arange(n)
-        bar_width = 0.25  # Slightly reduced bar width for more space between bars
+def chart_size_for(parent_frame):
+    """Pixel size the chart should be rendered at to fill parent_frame, or None."""
+    width = parent_frame.winfo_width() - 2 * CHART_PADDING
+    height = parent_frame.winfo_height() - 2 * CHART_PADDING
+    if width < 200 or height < 150:
+        return None # Not laid out yet
+    return (width, height)
 
-        # Bars with solid edge so each bar stands out
-        present_bars = ax.bar(indices - bar_width/2, df['Present'],
-                              width=bar_width, label='Present',
-                              color='#2B8CFF', edgecolor='black', linewidth=0.6)
-        absent_bars  = ax.bar(indices + bar_width/2, df['Absent'],
-                              width=bar_width, label='Absent',
-                              color='#FF4D4D', edgecolor='black', linewidth=0.6)
+def create_analytics_chart(parent_frame, batch_name, page=None):
+    """
+    Creates and embeds a grouped bar chart for attendance into a given parent frame.
+    """
+    with instrument.span('create_analytics_chart', batch=batch_name, page=page):
+        show_analytics_chart(parent_frame, *load_analytics_chart(batch_name, chart_size_for(parent_frame), page),
+                             on_page=lambda p: create_analytics_chart(parent_frame, batch_name, p))
+
+
+class ReportGrid:
+    """
+    Virtualized Treeview for a report DataFrame.
+
+    Only the rows that fit in the visible area exist as Treeview items, and
+    only a window of DATE_WINDOW date columns is shown at a time; scrolling
+    rebinds the same items to other rows/dates instead of inserting more.
+    Sorting and filtering reorder an index array over the DataFrame, never
+    the Tk items.
+    """
+    DATE_WINDOW = 12
+    FIXED_COLS = ['Roll No.', 'Name']
+    SUMMARY_COLS = ['Present', 'Absent', 'Total', 'Percent']
 
-        # Title & labels (slightly larger)
-        ax.set_title('Overall Attendance Summary', fontsize=20, fontweight='bold', pad=16)
-        ax.set_xlabel('Students', fontsize=15, labelpad=12)
-        ax.set_ylabel('Number of Days', fontsize=15, labelpad=12)
+    def __init__(self, parent, df):
+        self.df = df.reset_index(drop=True)
+        self.values = self.df.to_numpy(dtype=object)
+        self.col_pos = {col: i for i, col in enumerate(self.df.columns)}
+        self.fixed_cols = [c for c in self.FIXED_COLS if c in self.col_pos]
+        self.summary_cols = [c for c in self.SUMMARY_COLS if c in self.col_pos]
+        self.date_cols = [c for c in self.df.columns if c not in self.fixed_cols + self.summary_cols]
+        self.window = min(self.DATE_WINDOW, len(self.date_cols))
 
-        # X ticks and smaller student name font
-        ax.set_xticks(indices)
-        # Use full student name for labels
-        label_fontsize = 9 if n <= 15 else 7   # smaller when many students
-        rotation = 30 if n <= 12 else 60
-        ax.set_xticklabels(df['Student'], rotation=rotation, ha='right', fontsize=label_fontsize)
+        # Lower-cased "roll name" text used by the filter box
+        search_cols = [self.df[c].astype(str) for c in self.fixed_cols]
+        self.search_text = (search_cols[0].str.cat(search_cols[1:], sep=' ') if search_cols
+                            else pd.Series('', index=self.df.index)).str.lower()
+
+        self.order = np.arange(len(self.df)) # DataFrame row positions in display order
+        self.sort_col, self.sort_ascending = None, True
+        self.first_row = 0
+        self.first_date = 0
+        self.visible_rows = 15
+        self.items = [] # Pool of Treeview item ids, one per visible row
+
+        self.frame = ttk.Frame(parent)
+
+        filter_frame = ttk.Frame(self.frame)
+        filter_frame.pack(fill="x", pady=(0, 5))
+        ttk.Label(filter_frame, text="Filter:").pack(side="left")
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self.apply_filter(self.filter_var.get()))
+        ttk.Entry(filter_frame, textvariable=self.filter_var, width=30).pack(side="left", padx=5)
+        self.count_label = ttk.Label(filter_frame, text="")
+        self.count_label.pack(side="left", padx=10)
+
+        tree_frame = ttk.Frame(self.frame)
+        tree_frame.pack(fill="both", expand=True)
+        self.scroll_y = ttk.Scrollbar(tree_frame, orient="vertical", command=self._on_yscroll)
+        self.scroll_x = ttk.Scrollbar(tree_frame, orient="horizontal", command=self._on_xscroll)
+        self.tree = ttk.Treeview(tree_frame, height=self.visible_rows, show="headings", selectmode="browse")
+
+        self.scroll_y.pack(side="right", fill="y")
+        self.scroll_x.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+
+        # Date columns get stable ids; their headings follow the date window
+        self.date_slots = [f"date{i}" for i in range(self.window)]
+        self.tree["columns"] = self.fixed_cols + self.date_slots + self.summary_cols
+        for col in self.fixed_cols + self.summary_cols:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+        # Added a specific rule for the new 'Roll No.' column
+        if "Name" in self.col_pos:
+            self.tree.column("Name", width=150, anchor="w")
+        if "Roll No." in self.col_pos:
+            self.tree.column("Roll No.", width=110, anchor="w")
+        for col in self.summary_cols:
+            self.tree.column(col, width=60, anchor="center") # Summary cols
+        for slot in self.date_slots:
+            self.tree.column(slot, width=80, anchor="center") # Date cols
 
-        # Y ticks readability
-        ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
-        ax.tick_params(axis='y', labelsize=12)
-        ax.tick_params(axis='x', labelsize=label_fontsize)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", self._on_mousewheel)
+        self.tree.bind("<Button-5>", self._on_mousewheel)
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.visible_rows))
 
-        # Provide extra space at left/right of bars so they don't touch axis edges
-        ax.set_xlim(-0.7, n - 0.3) # Adjusted limits for more padding
-        ax.margins(x=0.02)
+        self.render()
 
-        # Gridlines
-        ax.grid(axis='y', linestyle='--', alpha=0.45)
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
 
-        # Put legend above the chart (keeps plotting area spacious)
-        ax.legend(loc='upper center', bbox_to_anchor=(0.5, 1.09), ncol=2, fontsize=12, frameon=False) # Slightly higher legend
+    # --- Data side: filtering and sorting work on self.order only ---
+
+    def apply_filter(self, text):
+        text = text.strip().lower()
+        if text:
+            positions = np.flatnonzero(self.search_text.str.contains(text, regex=False).to_numpy())
+        else:
+            positions = np.arange(len(self.df))
+        self.order = self._sorted(positions)
+        self.first_row = 0
+        self.render()
+
+    def sort_by(self, col):
+        if self.sort_col == col:
+            self.sort_ascending = not self.sort_ascending
+        else:
+            self.sort_col, self.sort_ascending = col, True
+        self.order = self._sorted(self.order)
+        self.first_row = 0
+        self.render()
+
+    def _sorted(self, positions):
+        if self.sort_col is None:
+            return np.sort(positions)
+        series = self.df[self.sort_col].iloc[positions].reset_index(drop=True)
+        ranked = series.sort_values(ascending=self.sort_ascending, kind="stable", na_position="last")
+        return positions[ranked.index.to_numpy()]
+
+    # --- View side: a fixed pool of items rebound to the visible window ---
+
+    def render(self):
+        with instrument.span('report.grid_render', rows=self.visible_rows):
+            self._render()
+
+    def _render(self):
+        total = len(self.order)
+        self.first_row = max(0, min(self.first_row, total - self.visible_rows))
+        count = min(self.visible_rows, total - self.first_row)
+
+        while len(self.items) < count:
+            self.items.append(self.tree.insert("", "end"))
+        while len(self.items) > count:
+            self.tree.delete(self.items.pop())
+
+        date_slice = self.date_cols[self.first_date:self.first_date + self.window]
+        for slot, date_col in zip(self.date_slots, date_slice):
+            self.tree.heading(slot, text=date_col, command=lambda c=date_col: self.sort_by(c))
+
+        cols = ([self.col_pos[c] for c in self.fixed_cols] + [self.col_pos[c] for c in date_slice]
+                + [self.col_pos[c] for c in self.summary_cols])
+        rows = self.values[self.order[self.first_row:self.first_row + count]][:, cols]
+        for iid, row in zip(self.items, rows):
+            self.tree.item(iid, values=list(row))
+
+        if total:
+            self.scroll_y.set(self.first_row / total, (self.first_row + count) / total)
+        else:
+            self.scroll_y.set(0, 1)
+        if self.date_cols:
+            self.scroll_x.set(self.first_date / len(self.date_cols),
+                              (self.first_date + self.window) / len(self.date_cols))
+        else:
+            self.scroll_x.set(0, 1)
+        self.count_label.config(text=f"{total} of {len(self.df)} students")
 
-        # Increase the margins around the plot area so labels & legend have room
-        fig.subplots_adjust(left=0.06, right=0.98, top=0.88, bottom=0.26) # Adjusted margins
+    def scroll_rows(self, delta):
+        self.first_row += delta
+        self.render()
 
-        # Embed in Tk window
-        canvas = FigureCanvasTkAgg(fig, master=parent_frame)
-        canvas.draw()
-        widget = canvas.get_tk_widget()
-        widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1, padx=20, pady=20) # Increased padding
+    def _scroll_target(self, args, position, page, total):
+        """Translates Scrollbar command arguments into a new first index."""
+        if args[0] == "moveto":
+            return int(float(args[1]) * total)
+        step = page if args[2] == "pages" else 1
+        return position + int(args[1]) * step
 
-    except Exception as e:
-        messagebox.showerror("Chart Error", f"Could not generate chart: {e}", parent=parent_frame)
+    def _on_yscroll(self, *args):
+        self.first_row = self._scroll_target(args, self.first_row, self.visible_rows, len(self.order))
+        self.render()
+
+    def _on_xscroll(self, *args):
+        target = self._scroll_target(args, self.first_date, self.window, len(self.date_cols))
+        self.first_date = max(0, min(target, len(self.date_cols) - self.window))
+        self.render()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            self.scroll_rows(-3)
+        elif event.num == 5:
+            self.scroll_rows(3)
+        else:
+            self.scroll_rows(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_configure(self, event):
+        """Resizes the item pool to the number of rows that fit in the tree."""
+        bbox = self.tree.bbox(self.items[0]) if self.items else None
+        if not bbox:
+            return
+        header_height, row_height = bbox[1], bbox[3]
+        rows = max(1, (event.height - header_height) // max(1, row_height))
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
 
 
 def create_detailed_report(parent_frame, batch_name):
     """
     Creates and embeds a detailed report Treeview into a given parent frame.
     """
+    with instrument.span('create_detailed_report', batch=batch_name):
+        df, msg = data_manager.get_report_data(batch_name)
+        show_detailed_report(parent_frame, batch_name, df, msg)
+
+def show_detailed_report(parent_frame, batch_name, df, msg):
+    """
+    Tk half of the report tab: shows the result of data_manager.get_report_data.
+    """
+    with instrument.span('report.show', rows=0 if df is None else len(df)):
+        _show_detailed_report(parent_frame, batch_name, df, msg)
+
+def _show_detailed_report(parent_frame, batch_name, df, msg):
     # Clear any previous widgets in the frame
-    for widget in parent_frame.winfo_children():
-        widget.destroy()
-        
-    df, msg = data_manager.get_report_data(batch_name)
+    _clear(parent_frame)
+
     if df is None or df.empty:
         ttk.Label(parent_frame, text=msg, style="Header.TLabel").pack(pady=50)
         return
@@ -113,60 +531,108 @@ def create_detailed_report(parent_frame, batch_name):
     title_label = ttk.Label(parent_frame, text=title_text, font=("-weight bold", 16))
     title_label.pack(pady=10)
 
-    tree_frame = ttk.Frame(parent_frame)
-    tree_frame.pack(fill="both", expand=True)
-
-    scroll_y = ttk.Scrollbar(tree_frame, orient="vertical")
-    scroll_x = ttk.Scrollbar(tree_frame, orient="horizontal")
-    
-    tree = ttk.Treeview(tree_frame, 
-                        yscrollcommand=scroll_y.set, 
-                        xscrollcommand=scroll_x.set,
-                        height=15)
-    
-    scroll_y.config(command=tree.yview)
-    scroll_x.config(command=tree.xview)
-
-    scroll_y.pack(side="right", fill="y")
-    scroll_x.pack(side="bottom", fill="x")
-    tree.pack(fill="both", expand=True)
-
-    # This part is dynamic, so it already includes 'Roll No.'
-    all_cols = list(df.columns)
-    tree["columns"] = all_cols
-    tree["show"] = "headings"
-
-    for col in all_cols:
-        tree.heading(col, text=col)
-        
-        # Added a specific rule for the new 'Roll No.' column
-        if col == "Name":
-            tree.column(col, width=150, anchor="w")
-        elif col == "Roll No.":
-            tree.column(col, width=110, anchor="w")
-        elif col in ['Present', 'Absent', 'Total', 'Percent']:
-            tree.column(col, width=60, anchor="center") # Summary cols
-        else:
-            tree.column(col, width=80, anchor="center") # Date cols
+    # Only the visible rows and a window of date columns become Treeview items
+    grid = ReportGrid(parent_frame, df)
+    grid.pack(fill="both", expand=True)
 
-    # This is also dynamic and works perfectly
-    for index, row in df.iterrows():
-        tree.insert("", "end", values=list(row))
+    # --- CHANGED ---
+    # Exports stream from the attendance data instead of writing this df,
+    # in the background and with a progress window (see ExportDialog)
+    def export_report():
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            # --- THIS LINE IS NOW FIXED ---
+            filetypes=[("CSV files", "*.csv"), ("Excel workbook", "*.xlsx"), ("All files", "*.*")],
+            title="Save Report As...",
+            initialfile=f"{batch_name}_report.csv"
+        )
+        if filename:
+            ExportDialog(parent_frame, [batch_name], filename, _export_format(filename))
 
-    def export_to_csv():
-        try:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                # --- THIS LINE IS NOW FIXED ---
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
-                title="Save Report As...",
-                initialfile=f"{batch_name}_report.csv"
-            )
-            if filename:
-                df.to_csv(filename, index=False)
-                messagebox.showinfo("Success", f"Report saved to {filename}", parent=parent_frame)
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not save file: {e}", parent=parent_frame)
+    def export_all_batches():
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel workbook (one sheet per batch)", "*.xlsx"),
+                       ("CSV files (one per batch, in a folder)", "*.csv")],
+            title="Export All Batches As...",
+            initialfile="all_batches_report.xlsx"
+        )
+        if filename:
+            fmt = _export_format(filename)
+            # Several CSV files go into a folder named like the chosen file
+            target = filename if fmt == 'xlsx' else os.path.splitext(filename)[0]
+            ExportDialog(parent_frame, list(data_manager.load_batches()), target, fmt)
+
+    button_frame = ttk.Frame(parent_frame)
+    button_frame.pack(pady=10)
+    ttk.Button(button_frame, text="Export...", command=export_report).pack(side="left", padx=5)
+    ttk.Button(button_frame, text="Export All Batches...", command=export_all_batches).pack(side="left", padx=5)
+
+def _export_format(filename):
+    return 'xlsx' if filename.lower().endswith('.xlsx') else 'csv'
+
+class ExportDialog:
+    """
+    Progress window of a report export. report_export.export_reports runs on
+    a worker thread and reports its progress through a plain attribute that
+    the Tk thread polls; Cancel (or closing the window) stops the export
+    after the chunk being written, leaving no partial files.
+    """
+    POLL_MS = 100
+
+    def __init__(self, parent, batch_names, target, fmt):
+        self.parent = parent
+        self.top = tk.Toplevel(parent)
+        self.top.title("Exporting Report")
+        self.top.transient(parent.winfo_toplevel())
+        self.top.resizable(False, False)
+        self.top.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.label = ttk.Label(self.top, text=f"Exporting to {os.path.basename(target)}...")
+        self.label.pack(padx=20, pady=(15, 5))
+        self.bar = ttk.Progressbar(self.top, mode="determinate", length=300)
+        self.bar.pack(padx=20, pady=5)
+        self.cancel_button = ttk.Button(self.top, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(pady=(5, 15))
+
+        self._cancel = threading.Event()
+        self._progress = (0, 0) # (students written, total), set by the worker thread
+        self.tasks = TaskRunner(self.top, max_workers=1)
+        self.tasks.submit("export", report_export.export_reports, batch_names, target, fmt,
+                          self._on_progress, self._cancel.is_set,
+                          on_done=self._done, on_error=self._failed)
+        self._poll()
+
+    def _on_progress(self, done, total):
+        # Worker thread: no Tk calls here
+        self._progress = (done, total)
+
+    def _poll(self):
+        if not self.tasks.is_pending("export"):
+            return
+        done, total = self._progress
+        if total and not self._cancel.is_set():
+            self.bar.config(maximum=total, value=done)
+            self.label.config(text=f"Exported {done} of {total} students...")
+        self.top.after(self.POLL_MS, self._poll)
+
+    def cancel(self):
+        self._cancel.set()
+        self.cancel_button.config(state="disabled")
+        self.label.config(text="Cancelling...")
+
+    def _close(self):
+        self.tasks.shutdown()
+        self.top.destroy()
+
+    def _done(self, result):
+        success, message = result
+        self._close()
+        if success:
+            messagebox.showinfo("Success", message, parent=self.parent)
+        elif not self._cancel.is_set():
+            messagebox.showerror("Error", message, parent=self.parent)
 
-    export_button = ttk.Button(parent_frame, text="Export CSV", command=export_to_csv)
-    export_button.pack(pady=10)
+    def _failed(self, error):
+        self._close()
+        messagebox.showerror("Error", f"Could not export: {error}", parent=self.parent)
@@ -0,0 +1,159 @@
+"""
+Stress test: many processes saving attendance into one data folder at once.
+
+Each writer is a separate Python process (like separate copies of the app or
+cli.py jobs on a shared drive) that owns one batch and saves --sessions
+sessions for it, re-saving every --overwrite-every'th one with overwrite.
+Optionally another process keeps compacting the log meanwhile. Afterwards
+every session is read back and compared with what its writer saved last.
+
+    python benchmarks/concurrent_writers.py [--writers 8] [--sessions 40]
+        [--layout single|partitioned] [--engine files|sqlite] [--compact]
+        [--json results.json]
+
+Exits with status 1 if any row was lost or changed.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUDENTS_PER_BATCH = 30
+
+def batch_name(writer):
+    return f"Batch {writer:02d}"
+
+def session_records(writer, day, version):
+    """The rows a writer saves for one session; differ per version so overwrites are checked."""
+    return [{'roll_no': f"{writer:02d}-{i:03d}", 'student_name': f"Student {i}",
+             'status': 'Present' if (i + day + version) % 3 else 'Absent'}
+            for i in range(STUDENTS_PER_BATCH)]
+
+def session_date(day):
+    return (datetime.date(2024, 1, 1) + datetime.timedelta(days=day)).isoformat()
+
+def writer_main(workdir, writer, sessions, overwrite_every, results):
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    import data_manager
+    latencies, failures = [], []
+    for day in range(sessions):
+        versions = [0, 1] if overwrite_every and day % overwrite_every == 0 else [0]
+        for version in versions:
+            start = time.perf_counter()
+            ok, msg = data_manager.save_attendance(session_date(day), batch_name(writer),
+                                                   session_records(writer, day, version),
+                                                   overwrite=version > 0)
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                failures.append(f"{batch_name(writer)} {session_date(day)}: {msg}")
+    results.put({'writer': writer, 'latencies': latencies, 'failures': failures})
+
+def compactor_main(workdir, stop):
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    import data_manager
+    while not stop.is_set():
+        data_manager.compact_attendance()
+        time.sleep(0.05)
+
+def verify(workdir, writers, sessions, overwrite_every):
+    """Returns a list of problems found in the saved data (empty if none)."""
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    import data_manager
+    df = data_manager.load_attendance()
+    problems = []
+    for writer in range(writers):
+        batch_df = df[df['batch'] == batch_name(writer)]
+        for day in range(sessions):
+            version = 1 if overwrite_every and day % overwrite_every == 0 else 0
+            expected = {(r['roll_no'], r['status']) for r in session_records(writer, day, version)}
+            got = batch_df[batch_df['date'] == session_date(day)]
+            got = set(zip(got['roll_no'], got['status']))
+            if got != expected:
+                problems.append(f"{batch_name(writer)} {session_date(day)}: "
+                                f"{len(expected - got)} rows missing, {len(got - expected)} unexpected")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=40, help="sessions saved by each writer")
+    parser.add_argument("--overwrite-every", type=int, default=5, help="re-save every n-th session (0 = never)")
+    parser.add_argument("--layout", choices=['single', 'partitioned'], default='single')
+    parser.add_argument("--engine", choices=['files', 'sqlite'], default='files')
+    parser.add_argument("--compact", action="store_true", help="compact the log continuously while writing")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, 'students.json'), 'w') as f:
+            json.dump({batch_name(w): [{'roll': r['roll_no'], 'name': r['student_name']}
+                                       for r in session_records(w, 0, 0)]
+                       for w in range(args.writers)}, f)
+        with open(os.path.join(workdir, 'storage.json'), 'w') as f:
+            json.dump({'engine': args.engine, 'layout': args.layout}, f)
+
+        results, stop = ctx.Queue(), ctx.Event()
+        procs = [ctx.Process(target=writer_main, args=(workdir, w, args.sessions, args.overwrite_every, results))
+                 for w in range(args.writers)]
+        compactor = ctx.Process(target=compactor_main, args=(workdir, stop)) if args.compact else None
+
+        start = time.perf_counter()
+        if compactor:
+            compactor.start()
+        for p in procs:
+            p.start()
+        reports = [results.get() for _ in procs]
+        elapsed = time.perf_counter() - start
+        for p in procs:
+            p.join()
+        if compactor:
+            stop.set()
+            compactor.join()
+
+        cwd = os.getcwd()
+        try:
+            problems = verify(workdir, args.writers, args.sessions, args.overwrite_every)
+        finally:
+            os.chdir(cwd)
+
+    latencies = sorted(t for r in reports for t in r['latencies'])
+    failures = [msg for r in reports for msg in r['failures']]
+    result = {
+        'benchmark': 'concurrent_writers',
+        'writers': args.writers,
+        'layout': args.layout,
+        'engine': args.engine,
+        'compact': args.compact,
+        'saves': len(latencies),
+        'elapsed_s': elapsed,
+        'saves_per_s': len(latencies) / elapsed,
+        'latency_ms_p50': statistics.median(latencies) * 1000,
+        'latency_ms_p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'failed_saves': failures,
+        'problems': problems,
+    }
+
+    print(f"{result['saves']} saves by {args.writers} processes in {elapsed:.2f} s "
+          f"({result['saves_per_s']:.1f} saves/s)")
+    print(f"save latency: p50 {result['latency_ms_p50']:.1f} ms, p95 {result['latency_ms_p95']:.1f} ms")
+    for msg in failures + problems:
+        print("  " + msg)
+    print("FAILED" if failures or problems else "OK: no rows lost")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if failures or problems else 0)
+
+if __name__ == "__main__":
+    main()
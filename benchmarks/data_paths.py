@@ -0,0 +1,222 @@
+"""
+Benchmark suite for the data paths: save, report, export and chart.
+
+Generates a synthetic data set (see synthetic_data.py) of the requested
+scale, optionally converts it to another storage mode, and times each case
+in fresh processes on a fresh copy of the data, so "cold" really means cold.
+For every case it records the wall time and the peak memory: the process'
+peak RSS growth during the case (Unix only) and, from one extra run under
+tracemalloc, the peak of Python allocations.
+
+    python benchmarks/data_paths.py [--batches 10] [--students 60] [--days 180]
+        [--storage csv|partitioned|parquet|sqlite] [--repeat 3]
+        [--cases report_cold,chart_cold] [--json results.json] [--compare old.json]
+
+Cases:
+    save_first      first save of a new session in a fresh process (index load included)
+    save_steady     median of 20 further saves in the same process
+    save_overwrite  overwrite of an existing session
+    save_bulk       50 new sessions in one save_attendance_bulk call
+    report_cold     get_report_data of the first batch in a fresh process
+    report_warm     second get_report_data of the same batch
+    export          streaming that report to CSV, as the report tab's export does
+    chart_cold      analytics chart of the first batch rendered to PNG
+    chart_warm      the same chart again (served from the chart cache)
+
+The Tk halves of the report and chart tabs (create_detailed_report,
+create_analytics_chart) need a display; the cases above time the work they
+hand to the background threads. --compare prints the ratio to an earlier
+--json file, so storage or report changes can be compared across runs.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import synthetic_data
+
+CASES = ['save_first', 'save_steady', 'save_overwrite', 'save_bulk',
+         'report_cold', 'report_warm', 'export', 'chart_cold', 'chart_warm']
+CHART_SIZE = (800, 500)
+
+# Runs inside the child process, in a copy of the data set; prints one JSON line
+CHILD = r"""
+import datetime, json, os, sys, time, tracemalloc
+sys.path.insert(0, {root!r})
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+import data_manager, analytics, lazy_import, report_export
+lazy_import.prewarm() # The app imports these in the background after start-up
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / 2**20
+
+case = {case!r}
+batch = data_manager.load_batches() and next(iter(data_manager.load_batches()))
+records = [{{'roll_no': s['roll'], 'student_name': s['name'], 'status': 'Present'}}
+           for s in data_manager.get_students(batch)]
+new_date = lambda i: (datetime.date(2100, 1, 1) + datetime.timedelta(days=i)).isoformat()
+
+# Work that belongs to the case's preconditions, not to the case itself
+if case in ('report_warm', 'export'):
+    report_df, _ = data_manager.get_report_data(batch)
+if case == 'save_steady':
+    data_manager.save_attendance(new_date(0), batch, records)
+if case == 'chart_warm':
+    analytics.load_analytics_chart(batch, {size!r})
+export_file = os.path.join(os.getcwd(), 'export.csv')
+
+trace = {trace!r}
+rss_before = peak_rss_mb()
+if trace:
+    tracemalloc.start()
+start = time.perf_counter()
+if case == 'save_first':
+    ok, msg = data_manager.save_attendance(new_date(0), batch, records)
+elif case == 'save_steady':
+    times = []
+    for i in range(1, 21):
+        t = time.perf_counter()
+        ok, msg = data_manager.save_attendance(new_date(i), batch, records)
+        times.append(time.perf_counter() - t)
+elif case == 'save_overwrite':
+    ok, msg = data_manager.save_attendance(data_manager.get_session_dates(batch)[0], batch, records, overwrite=True)
+elif case == 'save_bulk':
+    results = data_manager.save_attendance_bulk([(new_date(i), batch, records) for i in range(50)])
+    ok, msg = all(r[0] for r in results), results[0][1]
+elif case in ('report_cold', 'report_warm'):
+    report_df, msg = data_manager.get_report_data(batch)
+    ok = report_df is not None
+elif case == 'export':
+    ok, msg = report_export.export_reports([batch], export_file)
+elif case in ('chart_cold', 'chart_warm'):
+    png, msg, pages, page = analytics.load_analytics_chart(batch, {size!r})
+    ok = png is not None
+elapsed = time.perf_counter() - start
+if case == 'save_steady':
+    elapsed = sorted(times)[len(times) // 2]
+py_peak = tracemalloc.get_traced_memory()[1] if trace else None
+rss_after = peak_rss_mb()
+print(json.dumps({{
+    'seconds': elapsed,
+    'peak_rss_mb': None if rss_after is None else rss_after - rss_before,
+    'py_peak_mb': None if py_peak is None else py_peak / 2**20,
+    'ok': ok,
+    'message': msg,
+}}))
+"""
+
+def prepare_storage(data_dir, storage):
+    """
+    Converts the generated CSV data set in place to another storage mode and
+    builds the session indexes, as they would exist in a folder in daily use.
+    """
+    steps = {
+        'csv': "pass",
+        'partitioned': "data_manager.migrate_to_partitioned()",
+        'parquet': "data_manager.migrate_to_partitioned(); data_manager.convert_storage_backend('parquet')",
+        'sqlite': "data_manager.migrate_to_sqlite()",
+    }[storage]
+    code = (f"import sys; sys.path.insert(0, {ROOT!r}); import data_manager; {steps}; "
+            "[data_manager.get_session_dates(b) for b in data_manager.load_batches()]")
+    subprocess.run([sys.executable, "-c", code], cwd=data_dir, check=True)
+
+def run_case(data_dir, case, trace=False):
+    """
+    Runs one case in a fresh process on a fresh copy of the data set. With
+    trace, Python allocations are traced too; that slows the case down, so
+    traced runs are not used for timing.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        copy = os.path.join(workdir, 'data')
+        shutil.copytree(data_dir, copy)
+        out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT, case=case, size=CHART_SIZE, trace=trace)],
+                             cwd=copy, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{case} failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def summarize(runs, traced):
+    seconds = [r['seconds'] for r in runs]
+    rss = [r['peak_rss_mb'] for r in runs if r['peak_rss_mb'] is not None]
+    runs = runs + [traced]
+    return {
+        'median_s': statistics.median(seconds),
+        'min_s': min(seconds),
+        'runs': len(runs),
+        'peak_rss_mb': max(rss) if rss else None,
+        'py_peak_mb': traced['py_peak_mb'],
+        'ok': all(r['ok'] for r in runs),
+        'message': runs[-1]['message'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--students", type=int, default=60, help="students per batch")
+    parser.add_argument("--days", type=int, default=180, help="sessions per batch")
+    parser.add_argument("--overwrite-rate", type=float, default=0.05)
+    parser.add_argument("--storage", choices=['csv', 'partitioned', 'parquet', 'sqlite'], default='csv')
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per case")
+    parser.add_argument("--cases", help="comma separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args()
+    cases = args.cases.split(',') if args.cases else CASES
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    import pandas
+    result = {
+        'benchmark': 'data_paths',
+        'params': {'batches': args.batches, 'students': args.students, 'days': args.days,
+                   'overwrite_rate': args.overwrite_rate, 'storage': args.storage},
+        'environment': {'python': platform.python_version(), 'pandas': pandas.__version__,
+                        'platform': platform.platform()},
+        'cases': {},
+    }
+    with tempfile.TemporaryDirectory() as data_dir:
+        rows = synthetic_data.generate(data_dir, args.batches, args.students, args.days,
+                                       overwrite_rate=args.overwrite_rate)
+        prepare_storage(data_dir, args.storage)
+        result['params']['log_rows'] = rows
+        print(f"{rows} log rows, {args.batches} batches x {args.students} students x {args.days} days, "
+              f"storage: {args.storage}")
+        for case in cases:
+            timed = [run_case(data_dir, case) for _ in range(args.repeat)]
+            result['cases'][case] = summarize(timed, run_case(data_dir, case, trace=True))
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['cases']
+
+    print(f"{'case':<16}{'median':>12}{'peak RSS':>12}{'py peak':>12}")
+    for case, r in result['cases'].items():
+        rss = f"{r['peak_rss_mb']:.1f} MB" if r['peak_rss_mb'] is not None else "n/a"
+        line = f"{case:<16}{r['median_s'] * 1000:>9.1f} ms{rss:>12}{r['py_peak_mb']:>9.1f} MB"
+        if case in baseline:
+            line += f"   x{r['median_s'] / baseline[case]['median_s']:.2f} vs baseline"
+        if not r['ok']:
+            line += f"   FAILED: {r['message']}"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Equivalence check: random saves and overwrites, compared with the original report code.
+
+For each storage mode, a fresh data folder gets a random sequence of saves,
+overwrites, refused re-saves, bulk saves (with duplicate and malformed
+sessions among them) and compactions. Every --check-every steps:
+- get_report_data of every batch must equal the report the original code
+  built, i.e. a pivot of the live rows merged with the roster;
+- low_attendance (over all dates and over a random date range) must list
+  the students whose counts from the live rows are below the threshold;
+- get_alerts must list the report rows under the alert rules.
+The live rows are the script's own record of what it saved, never read
+back from the data folder. With CSV logs the final newline of a log is cut
+off now and then, as a hand edit in a spreadsheet or text editor would.
+
+    python benchmarks/equivalence.py [--storage csv,partitioned,parquet,sqlite]
+        [--steps 300] [--check-every 10] [--seed 1]
+
+Exits with status 1 if any mode shows a difference.
+"""
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import traceback
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORAGE = {
+    'csv': {'engine': 'files', 'layout': 'single'},
+    'partitioned': {'engine': 'files', 'layout': 'partitioned', 'partition_by_month': True},
+    'parquet': {'engine': 'files', 'layout': 'partitioned', 'backend': 'parquet'},
+    'sqlite': {'engine': 'sqlite'},
+}
+BATCHES = 4
+STUDENTS_PER_BATCH = 12
+DAYS = 120 # Session dates are drawn from the first DAYS days of 2024
+COUNT_COLUMNS = ['Present', 'Absent', 'Total', 'Percent']
+
+def batch_name(i):
+    return f"Batch {i}"
+
+def roster():
+    return {batch_name(b): [{'roll': f"{b}{s:03d}", 'name': f"Student {b}-{s}"} for s in range(STUDENTS_PER_BATCH)]
+            for b in range(BATCHES)}
+
+def session_date(day):
+    return (datetime.date(2024, 1, 1) + datetime.timedelta(days=day)).isoformat()
+
+
+class Model:
+    """What the script saved: {(batch, date): [records]}, the live sessions."""
+    def __init__(self, students):
+        self.students = students
+        self.sessions = {}
+
+    def random_records(self, rng, batch):
+        """Records of a random subset of the batch, so some students miss some sessions."""
+        return [{'roll_no': s['roll'], 'student_name': s['name'],
+                 'status': 'Present' if rng.random() < 0.7 else 'Absent'}
+                for s in self.students[batch] if rng.random() < 0.9]
+
+    def rows(self):
+        rows = [dict(record, date=date_, batch=batch)
+                for (batch, date_), records in self.sessions.items() for record in records]
+        return pd.DataFrame(rows, columns=['roll_no', 'student_name', 'status', 'date', 'batch'])
+
+
+def baseline_report(df, students, batch):
+    """The report as the original get_report_data built it from the live rows df."""
+    if df.empty:
+        return None
+    roster_df = pd.DataFrame(students[batch]).rename(columns={'roll': 'roll_no', 'name': 'student_name'})
+    roster_df['roll_no'] = roster_df['roll_no'].astype(str)
+    batch_df = df[df['batch'] == batch]
+    if batch_df.empty:
+        report_df = roster_df
+    else:
+        pivot_df = batch_df.pivot_table(index=['roll_no', 'student_name'], columns='date',
+                                        values='status', aggfunc='first')
+        report_df = pd.merge(roster_df, pivot_df, on=['roll_no', 'student_name'], how='left')
+    report_df['Present'] = (report_df == 'Present').sum(axis=1)
+    report_df['Absent'] = (report_df == 'Absent').sum(axis=1)
+    report_df['Total'] = report_df['Present'] + report_df['Absent']
+    report_df['Percent'] = (report_df['Present'].div(report_df['Total']).fillna(0) * 100).round(1)
+    report_df = report_df.rename(columns={'student_name': 'Name', 'roll_no': 'Roll No.'})
+    date_cols = [col for col in report_df.columns if col not in ['Roll No.', 'Name'] + COUNT_COLUMNS]
+    return report_df[['Roll No.', 'Name'] + date_cols + COUNT_COLUMNS]
+
+def report_cells(report_df):
+    """Column names and rows of a report, with empty cells as None and counts as floats."""
+    rows = []
+    for row in report_df.astype(object).itertuples(index=False):
+        rows.append(tuple(float(value) if col in COUNT_COLUMNS else (None if pd.isna(value) else str(value))
+                          for col, value in zip(report_df.columns, row)))
+    return [str(col) for col in report_df.columns], rows
+
+def baseline_low(df, threshold, start_date=None, end_date=None):
+    """{(batch, roll_no, name): (present, total, percent)} of the students below threshold."""
+    if start_date:
+        df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+    low = {}
+    for key, rows in df.groupby(['batch', 'roll_no', 'student_name']):
+        present = int((rows['status'] == 'Present').sum())
+        total = int(rows['status'].isin(['Present', 'Absent']).sum())
+        percent = round(present / total * 100, 1) if total else 0.0
+        if percent < threshold:
+            low[key] = (present, total, percent)
+    return low
+
+
+def compare(dm, model, rng):
+    """Returns a list of differences between the app's results and the baseline (empty if none)."""
+    problems = []
+    df = model.rows()
+    for batch in model.students:
+        got, message = dm.get_report_data(batch)
+        expected = baseline_report(df, model.students, batch)
+        if got is None or expected is None:
+            if (got is None) != (expected is None):
+                problems.append(f"report {batch}: got {message!r}, expected {'no report' if expected is None else 'a report'}")
+            continue
+        got_columns, got_rows = report_cells(got)
+        columns, rows = report_cells(expected)
+        if got_columns != columns:
+            problems.append(f"report {batch}: columns {got_columns[:4]}... != {columns[:4]}...")
+        elif got_rows != rows:
+            diff = next(i for i, (a, b) in enumerate(zip(got_rows, rows)) if a != b) if len(got_rows) == len(rows) else None
+            problems.append(f"report {batch}: {len(got_rows)} rows vs {len(rows)}, first difference at row {diff}")
+
+    threshold = rng.choice([50.0, 75.0, 90.0])
+    ranges = [(None, None)]
+    first, last = sorted(rng.sample(range(DAYS), 2))
+    ranges.append((session_date(first), session_date(last)))
+    for start_date, end_date in ranges:
+        got, message = dm.low_attendance(threshold, None, start_date, end_date)
+        if got is None:
+            if not df.empty:
+                problems.append(f"low_attendance: {message}")
+            continue
+        got = {(r.batch, r.roll_no, r.student_name): (int(r.Present), int(r.Total), float(r.Percent))
+               for r in got.itertuples(index=False)}
+        expected = baseline_low(df, threshold, start_date, end_date)
+        if got != expected:
+            problems.append(f"low_attendance < {threshold:g}% {start_date or ''}..{end_date or ''}: "
+                            f"{len(set(got) - set(expected))} unexpected, {len(set(expected) - set(got))} missing, "
+                            f"{sum(got[k] != expected[k] for k in set(got) & set(expected))} with other counts")
+
+    alerts, message = dm.get_alerts()
+    if alerts is None:
+        problems.append(f"get_alerts: {message}")
+    else:
+        rules = dm.get_alert_rules()
+        expected = set()
+        for batch in model.students:
+            report_df = baseline_report(df, model.students, batch)
+            if report_df is None:
+                continue
+            low = report_df[(report_df['Total'] >= rules['min_sessions']) & (report_df['Percent'] < rules['threshold'])]
+            expected.update((batch, r['Roll No.'], r['Name'], int(r['Present']), int(r['Total']), float(r['Percent']))
+                            for _, r in low.iterrows())
+        got = {(a['batch'], a['roll_no'], a['student_name'], a['present'], a['total'], float(a['percent']))
+               for a in alerts}
+        if got != expected:
+            problems.append(f"get_alerts: {len(got - expected)} unexpected, {len(expected - got)} missing")
+    return problems
+
+
+def cut_final_newline(storage):
+    """Drops the line break at the end of one CSV log, if the mode has CSV logs."""
+    if storage == 'csv':
+        paths = ['attendance.csv']
+    elif storage == 'partitioned':
+        paths = glob.glob(os.path.join('attendance_data', '*', '*.csv'))
+    else:
+        return None
+    paths = [p for p in paths if os.path.exists(p) and os.path.getsize(p)]
+    if not paths:
+        return None
+    path = sorted(paths)[0]
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b'\n':
+            f.seek(-1, os.SEEK_END)
+            f.truncate()
+    return path
+
+def run_storage(storage, steps, check_every, seed, results):
+    """Replays one random sequence in a fresh folder; puts (storage, saves, checks, problems) on results."""
+    try:
+        results.put(replay(storage, steps, check_every, seed))
+    except Exception:
+        results.put((storage, 0, 0, [traceback.format_exc()]))
+
+def replay(storage, steps, check_every, seed):
+    sys.path.insert(0, ROOT)
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        students = roster()
+        with open('students.json', 'w') as f:
+            json.dump(students, f)
+        with open('storage.json', 'w') as f:
+            json.dump(STORAGE[storage], f)
+        import data_manager as dm
+        problems = []
+        dm.set_error_handler(lambda title, message: problems.append(f"{title}: {message}"))
+        dm.setup_files()
+        dm.set_alert_rules(threshold=75.0, min_sessions=3)
+
+        model = Model(students)
+        saves = checks = 0
+        problems += compare(dm, model, rng)
+        for step in range(1, steps + 1):
+            batch = rng.choice(list(students))
+            date_ = session_date(rng.randrange(DAYS))
+            action = rng.random()
+            if action < 0.75:
+                # New session, overwrite, or a re-save that must be refused
+                overwrite = rng.random() < 0.7
+                records = model.random_records(rng, batch)
+                success, message = dm.save_attendance(date_, batch, records, overwrite=overwrite)
+                expected = overwrite or (batch, date_) not in model.sessions
+                if success != expected:
+                    problems.append(f"step {step}: save {batch} {date_} overwrite={overwrite}: {message}")
+                if success:
+                    model.sessions[(batch, date_)] = records
+                saves += 1
+            elif action < 0.9:
+                overwrite = rng.random() < 0.5
+                sessions = [(session_date(rng.randrange(DAYS)), rng.choice(list(students))) for _ in range(rng.randint(2, 6))]
+                sessions.append(rng.choice(sessions)) # Listed twice: only saved the first time
+                sessions.append((date_.replace('-', '/'), batch)) # Malformed date: refused
+                requests = [(d, b, model.random_records(rng, b)) for d, b in sessions]
+                results_ = dm.save_attendance_bulk(requests, overwrite=overwrite)
+                seen = set()
+                for (d, b, records), (success, message) in zip(requests, results_):
+                    expected = '/' not in d and (d, b) not in seen and (overwrite or (b, d) not in model.sessions)
+                    seen.add((d, b))
+                    if success != expected:
+                        problems.append(f"step {step}: bulk save {b} {d} overwrite={overwrite}: {message}")
+                    if success:
+                        model.sessions[(b, d)] = records
+                saves += len(requests)
+            elif action < 0.95:
+                dm.compact_attendance()
+            else:
+                cut_final_newline(storage)
+            if rng.random() < 0.1:
+                dm.clear_report_cache() # As if another process had opened the report
+            if step % check_every == 0 or step == steps:
+                problems += [f"step {step}: {p}" for p in compare(dm, model, rng)]
+                checks += 1
+            if problems:
+                break
+        os.chdir(ROOT)
+    return storage, saves, checks, problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--storage", default=','.join(STORAGE),
+                        help="comma separated storage modes: " + ", ".join(STORAGE))
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--check-every", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # One process per mode: data_manager keeps its caches for the folder it started in
+    ctx = multiprocessing.get_context("spawn")
+    failed = False
+    for storage in args.storage.split(','):
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_storage, args=(storage, args.steps, args.check_every, args.seed, results))
+        proc.start()
+        storage, saves, checks, problems = results.get()
+        proc.join()
+        print(f"{storage}: {saves} sessions saved, {checks} checks, "
+              f"{'OK' if not problems else 'FAILED'}")
+        for msg in problems[:10]:
+            print("  " + msg.rstrip())
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
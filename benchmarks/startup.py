@@ -0,0 +1,86 @@
+"""
+Cold-start benchmark: time from interpreter start to the first frame.
+
+Every run starts a fresh Python process (so nothing is cached in memory),
+imports main, builds AttendanceApp and waits until the welcome frame has
+been drawn. It reports the import time, the time to first frame and which
+heavy modules were already loaded at that point.
+
+    python benchmarks/startup.py [--runs 5] [--json results.json]
+
+Without a display only the import phase can be measured; this is reported
+as "first_frame_s": null.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child process; prints one JSON line
+CHILD = r"""
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main
+imported = time.perf_counter()
+first_frame = None
+try:
+    main.PREWARM_IMPORTS = False # Measure the frame, not the prewarm thread
+    app = main.AttendanceApp()
+    app.update()
+    first_frame = time.perf_counter() - start
+    app.destroy()
+except Exception as e: # No display
+    error = str(e)
+else:
+    error = None
+print(json.dumps({{
+    'import_s': imported - start,
+    'first_frame_s': first_frame,
+    'heavy_modules_loaded': [m for m in ('pandas', 'numpy', 'matplotlib') if m in sys.modules],
+    'error': error,
+}}))
+"""
+
+def run_once():
+    # Run in an empty directory so setup_files() does not touch real data
+    with tempfile.TemporaryDirectory() as workdir:
+        out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT)], cwd=workdir,
+                             capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    frames = [r['first_frame_s'] for r in runs if r['first_frame_s'] is not None]
+    result = {
+        'benchmark': 'startup',
+        'runs': args.runs,
+        'import_s_median': statistics.median(r['import_s'] for r in runs),
+        'first_frame_s_median': statistics.median(frames) if frames else None,
+        'heavy_modules_loaded': runs[-1]['heavy_modules_loaded'],
+        'error': runs[-1]['error'],
+    }
+
+    print(f"import main:         {result['import_s_median'] * 1000:8.1f} ms (median of {args.runs})")
+    if frames:
+        print(f"time to first frame: {result['first_frame_s_median'] * 1000:8.1f} ms")
+    else:
+        print(f"time to first frame: n/a ({result['error']})")
+    print(f"heavy modules loaded at first frame: {', '.join(result['heavy_modules_loaded']) or 'none'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Synthetic data for the benchmarks: a students.json and an attendance.csv log
+of batches x students x days sessions in a directory.
+
+    python benchmarks/synthetic_data.py OUT_DIR [--batches 10] [--students 60]
+        [--days 180] [--overwrite-rate 0.05] [--seed 1]
+
+Every batch has a session on every day. A fraction of the sessions
+(--overwrite-rate) is saved twice, the second time after a tombstone, just
+like an overwrite from the app, so the log also carries superseded rows.
+Batches are named "Batch 000", "Batch 001", ...
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from data_manager import TOMBSTONE_STATUS
+
+def batch_name(i):
+    return f"Batch {i:03d}"
+
+def generate(out_dir, batches=10, students=60, days=180, absent_rate=0.15, overwrite_rate=0.05, seed=1):
+    """Writes students.json and attendance.csv into out_dir; returns the number of log rows."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    names = [batch_name(b) for b in range(batches)]
+    rolls = np.array([f"{b:03d}{s:04d}" for b in range(batches) for s in range(students)], dtype=object)
+    student_names = np.array([f"Student {b}-{s}" for b in range(batches) for s in range(students)], dtype=object)
+    with open(os.path.join(out_dir, 'students.json'), 'w') as f:
+        json.dump({name: [{'roll': rolls[b * students + s], 'name': student_names[b * students + s]}
+                          for s in range(students)]
+                   for b, name in enumerate(names)}, f)
+
+    start = datetime.date(2024, 1, 1)
+    dates = np.array([(start + datetime.timedelta(days=d)).isoformat() for d in range(days)], dtype=object)
+
+    # One row per (day, batch, student), saved day by day like the app does
+    day_idx = np.repeat(np.arange(days), batches * students)
+    student_idx = np.tile(np.arange(batches * students), days)
+    statuses = np.where(rng.random(len(day_idx)) < absent_rate, 'Absent', 'Present').astype(object)
+    log = pd.DataFrame({
+        'roll_no': rolls[student_idx],
+        'student_name': student_names[student_idx],
+        'status': statuses,
+        'date': dates[day_idx],
+        'batch': np.array(names, dtype=object)[student_idx // students],
+    })
+
+    # Overwritten sessions: a tombstone plus a second copy with other statuses
+    session_count = days * batches
+    overwritten = np.flatnonzero(rng.random(session_count) < overwrite_rate)
+    extra = []
+    for session in overwritten:
+        day, b = divmod(int(session), batches)
+        first = day * batches * students + b * students
+        rows = log.iloc[first:first + students].copy()
+        rows['status'] = np.where(rng.random(students) < absent_rate, 'Absent', 'Present')
+        tombstone = pd.DataFrame([{'roll_no': '', 'student_name': '', 'status': TOMBSTONE_STATUS,
+                                   'date': dates[day], 'batch': names[b]}])
+        extra.extend([tombstone, rows])
+    if extra:
+        log = pd.concat([log] + extra, ignore_index=True)
+
+    log.to_csv(os.path.join(out_dir, 'attendance.csv'), index=False)
+    return len(log)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--students", type=int, default=60, help="students per batch")
+    parser.add_argument("--days", type=int, default=180, help="sessions per batch")
+    parser.add_argument("--absent-rate", type=float, default=0.15)
+    parser.add_argument("--overwrite-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rows = generate(args.out_dir, args.batches, args.students, args.days,
+                    args.absent_rate, args.overwrite_rate, args.seed)
+    print(f"Wrote {rows} attendance rows for {args.batches} batches x {args.students} students "
+          f"x {args.days} days to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Headless command-line entry point, for scripts and scheduled jobs.
+
+Uses the same data files as the GUI (run it from the same folder, or pass
+--data-dir) but never opens a window: errors are printed to stderr.
+
+    python cli.py import sessions.csv [more.xlsx ...] [--overwrite]
+    python cli.py report [--batch "CSE(AIML)"] [--out-dir reports | --xlsx reports.xlsx]
+    python cli.py query [--batch B ...] [--from 2024-01-01] [--to 2024-03-31]
+        [--roll R ...] [--group-by batch,roll_no,student_name] [--below 75] [--out rows.csv]
+    python cli.py alerts [--batch B] [--threshold 75] [--min-sessions 5]
+    python cli.py compact
+    python cli.py migrate [--by-month]
+    python cli.py convert parquet
+    python cli.py migrate-sqlite
+
+Any command takes --trace (timing spans as JSON lines on stderr), --trace-file
+FILE (the same, into FILE), --trace-memory (adds memory deltas) and --profile
+DIR (a cProfile dump per operation); see instrument.py. These go before the
+command: python cli.py --trace compact
+
+Import files need 'date', 'batch', 'roll_no' and 'status' columns
+(--date/--batch can stand in for missing ones). 'student_name' is optional
+and filled in from the roster; status must be Present/Absent or P/A and
+date YYYY-MM-DD (Excel date cells work too). Every (date, batch) pair in a
+file is saved as one session; a session with a bad date or status is
+reported and skipped.
+
+query prints matching attendance rows (or, with --group-by, Present/Absent/
+Total/Percent per group) as CSV; --below lists students under a percentage.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import data_manager
+import instrument
+import report_export
+from lazy_import import lazy_module
+from storage_backends import BACKENDS
+
+pd = lazy_module('pandas')
+
+IMPORT_COLUMNS = ['date', 'batch', 'roll_no', 'status']
+STATUS_ALIASES = {'p': 'Present', 'present': 'Present', 'a': 'Absent', 'absent': 'Absent'}
+# Accepted import dates; Excel date cells read as text look like '2024-01-05 00:00:00'
+DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S']
+
+
+def _print_error(title, message):
+    print(f"{title}: {message}", file=sys.stderr)
+
+
+def _read_table(path):
+    """Reads a .csv or .xlsx/.xls file as text columns."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xls'):
+        df = pd.read_excel(path, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    return df.fillna('')
+
+
+def _parse_date(value):
+    """The date as 'YYYY-MM-DD', or None if it is not in one of DATE_FORMATS."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    return None
+
+
+def _date_arg(value):
+    date_ = _parse_date(value)
+    if date_ is None:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', use YYYY-MM-DD")
+    return date_
+
+
+def _session_records(batch, rows):
+    """Turns the import rows of one session into save_attendance records."""
+    records = []
+    for row in rows.itertuples(index=False):
+        roll_no = str(row.roll_no).strip()
+        status = STATUS_ALIASES.get(str(row.status).strip().lower())
+        if status is None:
+            raise ValueError(f"unknown status '{row.status}' for roll no. '{roll_no}' (use Present/Absent or P/A)")
+        name = str(getattr(row, 'student_name', '') or '').strip()
+        if not name:
+            student = data_manager.get_student(batch, roll_no)
+            if student is None:
+                raise ValueError(f"roll no. '{roll_no}' is not in the roster of '{batch}'")
+            name = student['name']
+        records.append({'roll_no': roll_no, 'student_name': name, 'status': status})
+    return records
+
+
+def cmd_import(args):
+    failures = 0
+    for path in args.files:
+        try:
+            df = _read_table(path)
+        except Exception as e:
+            print(f"{path}: could not read file: {e}", file=sys.stderr)
+            failures += 1
+            continue
+        if args.date:
+            df['date'] = args.date
+        if args.batch:
+            df['batch'] = args.batch
+        missing = [col for col in IMPORT_COLUMNS if col not in df.columns]
+        if missing:
+            print(f"{path}: missing columns {', '.join(missing)}", file=sys.stderr)
+            failures += 1
+            continue
+        # Same date written two ways is one session; dates that do not parse are kept to be reported below
+        dates = df['date'].map(_parse_date)
+        df['date'] = dates.where(dates.notna(), df['date'])
+
+        sessions = []
+        for (date_, batch), rows in df.groupby(['date', 'batch'], sort=True):
+            try:
+                if _parse_date(date_) != date_:
+                    raise ValueError(f"invalid date '{date_}', use YYYY-MM-DD")
+                sessions.append((date_, batch, _session_records(batch, rows)))
+            except ValueError as e:
+                print(f"{path}: {batch} {date_}: {e}", file=sys.stderr)
+                failures += 1
+        # All sessions of a file are written in one pass
+        results = data_manager.save_attendance_bulk(sessions, overwrite=args.overwrite)
+        for (date_, batch, _), (success, message) in zip(sessions, results):
+            print(f"{path}: {batch} {date_}: {message}", file=sys.stdout if success else sys.stderr)
+            failures += not success
+    return 1 if failures else 0
+
+
+def cmd_report(args):
+    batches = args.batch or list(data_manager.load_batches())
+    if args.xlsx:
+        success, message = report_export.export_reports(batches, args.xlsx, 'xlsx')
+        print(message, file=sys.stdout if success else sys.stderr)
+        return 0 if success else 1
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    failures = 0
+    for batch in batches:
+        out_file = os.path.join(args.out_dir, report_export.report_file_name(batch))
+        # Streams the report to the file; the summary is dropped before the next batch
+        success, message = report_export.export_reports([batch], out_file)
+        print(f"{batch}: {message}", file=sys.stdout if success else sys.stderr)
+        failures += not success
+        data_manager.clear_report_cache(batch)
+    return 1 if failures else 0
+
+
+def cmd_query(args):
+    if args.below is not None:
+        df, message = data_manager.low_attendance(args.below, args.batch, args.start_date, args.end_date)
+    else:
+        group_by = args.group_by.split(',') if args.group_by else None
+        df, message = data_manager.query_attendance(args.batch, args.start_date, args.end_date,
+                                                    args.roll, group_by)
+    if df is None:
+        print(message, file=sys.stderr)
+        return 1
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"{message} -> {args.out}")
+    else:
+        df.to_csv(sys.stdout, index=False)
+    return 0
+
+
+def cmd_alerts(args):
+    if args.threshold is not None or args.min_sessions is not None:
+        success, message = data_manager.set_alert_rules(args.threshold, args.min_sessions)
+        print(message, file=sys.stdout if success else sys.stderr)
+        if not success:
+            return 1
+    alerts, message = data_manager.get_alerts(args.batch)
+    if alerts is None:
+        print(message, file=sys.stderr)
+        return 1
+    print(message)
+    for alert in alerts:
+        print(f"{alert['batch']}\t{alert['roll_no']}\t{alert['student_name']}\t"
+              f"{alert['present']}/{alert['total']}\t{alert['percent']:g}%")
+    return 0
+
+
+def cmd_compact(args):
+    success, message = data_manager.compact_attendance()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_migrate(args):
+    success, message = data_manager.migrate_to_partitioned(partition_by_month=args.by_month)
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_convert(args):
+    success, message = data_manager.convert_storage_backend(args.backend)
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def cmd_migrate_sqlite(args):
+    success, message = data_manager.migrate_to_sqlite()
+    print(message, file=sys.stdout if success else sys.stderr)
+    return 0 if success else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Attendance Management System (headless).")
+    parser.add_argument('--data-dir', default='.', help="folder holding students.json and the attendance data")
+    parser.add_argument('--trace', action='store_true', help="log timing spans as JSON lines to stderr")
+    parser.add_argument('--trace-file', metavar='FILE', help="log timing spans as JSON lines to FILE")
+    parser.add_argument('--trace-memory', action='store_true', help="add memory deltas to the spans (slower)")
+    parser.add_argument('--profile', metavar='DIR', help="write a cProfile dump per operation to DIR")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('import', help="save attendance sessions from CSV/Excel files")
+    p.add_argument('files', nargs='+')
+    p.add_argument('--overwrite', action='store_true', help="replace sessions that already exist")
+    p.add_argument('--batch', help="batch for every row (if the files have no 'batch' column)")
+    p.add_argument('--date', type=_date_arg, help="date (YYYY-MM-DD) for every row (if the files have no 'date' column)")
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser('report', help="export the detailed report of each batch to CSV")
+    p.add_argument('--batch', action='append', help="batch to export (repeatable, default: all)")
+    p.add_argument('--out-dir', default='reports')
+    p.add_argument('--xlsx', metavar='FILE', help="write one Excel workbook with a sheet per batch instead")
+    p.set_defaults(func=cmd_report)
+
+    p = commands.add_parser('query', help="attendance rows or totals across batches")
+    p.add_argument('--batch', action='append', help="batch to include (repeatable, default: all)")
+    p.add_argument('--from', dest='start_date', help="first date (YYYY-MM-DD), inclusive")
+    p.add_argument('--to', dest='end_date', help="last date (YYYY-MM-DD), inclusive")
+    p.add_argument('--roll', action='append', help="roll no. to include (repeatable, default: all)")
+    p.add_argument('--group-by', help="comma separated: " + ", ".join(data_manager.QUERY_GROUP_COLUMNS))
+    p.add_argument('--below', type=float, metavar='PERCENT',
+                   help="list students whose attendance is below PERCENT (ignores --roll/--group-by)")
+    p.add_argument('--out', help="write CSV here instead of printing it")
+    p.set_defaults(func=cmd_query)
+
+    p = commands.add_parser('alerts', help="list students below the attendance threshold")
+    p.add_argument('--batch', help="only this batch")
+    p.add_argument('--threshold', type=float, metavar='PERCENT', help="change the alert threshold (saved)")
+    p.add_argument('--min-sessions', type=int, help="change the sessions needed before alerting (saved)")
+    p.set_defaults(func=cmd_alerts)
+
+    p = commands.add_parser('compact', help="fold overwritten sessions out of the logs")
+    p.set_defaults(func=cmd_compact)
+
+    p = commands.add_parser('migrate', help="switch to one log per batch")
+    p.add_argument('--by-month', action='store_true', help="also split each batch by month")
+    p.set_defaults(func=cmd_migrate)
+
+    p = commands.add_parser('convert', help="rewrite the logs in another storage backend")
+    p.add_argument('backend', choices=list(BACKENDS))
+    p.set_defaults(func=cmd_convert)
+
+    p = commands.add_parser('migrate-sqlite', help="move roster and attendance into an SQLite database")
+    p.set_defaults(func=cmd_migrate_sqlite)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    data_manager.set_error_handler(_print_error)
+    # Paths are relative to where the command was started, not --data-dir
+    if getattr(args, 'files', None):
+        args.files = [os.path.abspath(path) for path in args.files]
+    for name in ('out_dir', 'xlsx', 'out'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    if args.trace or args.trace_file or args.trace_memory or args.profile:
+        instrument.enable(log=os.path.abspath(args.trace_file) if args.trace_file
+                          else bool(args.trace or args.trace_memory),
+                          memory=args.trace_memory,
+                          profile_dir=os.path.abspath(args.profile) if args.profile else None)
+    os.chdir(args.data_dir)
+    data_manager.setup_files()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
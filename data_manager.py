@@ -1,18 +1,117 @@
-import pandas as pd
 import os
 import json
-from tkinter import messagebox
+import contextlib
+import threading
+from datetime import datetime
+from urllib.parse import quote, unquote
+import instrument
+from lazy_import import lazy_module
+from file_lock import DataLock
+from storage_backends import ATTENDANCE_COLUMNS, get_backend
+from report_summary import BatchSummary
+from alerts import AlertBook
+from roster_index import RosterIndex
+from sqlite_store import SqliteStore
+
+# Imported on first use, so start-up does not wait for pandas
+pd = lazy_module('pandas')
+np = lazy_module('numpy')
 
 # --- Define filenames ---
 STUDENTS_FILE = 'students.json'
 ATTENDANCE_FILE = 'attendance.csv'
+# Sidecar catalog of the sessions in ATTENDANCE_FILE, see _get_session_index()
+SESSION_INDEX_FILE = 'attendance_index.json'
+# Saves add a line to the index's journal (the index file name + 'l'); this many
+# lines are folded back into the index file by the next save
+SESSION_JOURNAL_LIMIT = 500
+# Root directory of the 'partitioned' layout (one sub-directory per batch)
+ATTENDANCE_DIR = 'attendance_data'
+STORAGE_CONFIG_FILE = 'storage.json'
+# Roster and attendance of the 'sqlite' engine, see sqlite_store.py
+DATABASE_FILE = 'attendance.db'
+# Advisory lock shared by every process that writes to this data folder
+LOCK_FILE = 'attendance.lock'
+# Seconds a save waits for another process to release LOCK_FILE
+LOCK_TIMEOUT = 10
+# Low-attendance counters and alerts, see alerts.py
+ALERTS_FILE = 'attendance_alerts.json'
+# Saves append the counters they changed here instead of rewriting ALERTS_FILE;
+# after this many lines the next save writes ALERTS_FILE afresh
+ALERTS_JOURNAL_FILE = 'attendance_alerts.jsonl'
+ALERTS_JOURNAL_LIMIT = 500
+# Passes over the logs get_alerts makes to recount batches; all but the
+# last run without the lock and give up on batches saved to meanwhile
+ALERT_RECOUNT_TRIES = 3
+
+DEFAULT_STORAGE_CONFIG = {
+    'engine': 'files',            # 'files' (students.json + logs below) or 'sqlite' (DATABASE_FILE)
+    'layout': 'single',           # 'single' (ATTENDANCE_FILE) or 'partitioned' (ATTENDANCE_DIR)
+    'partition_by_month': False,  # partitioned layout only: one file per batch and month
+    'backend': 'csv',             # file format of the logs, see storage_backends.BACKENDS
+}
+
+# --- Append-only log settings ---
+# attendance.csv is written as an append-only log. Overwriting a session appends
+# a tombstone row (this status, empty roll/name) followed by the replacement rows;
+# readers drop every earlier row of that (date, batch) session.
+TOMBSTONE_STATUS = '__replaced__'
+# Fold the log in a background thread after this many overwrites.
+AUTO_COMPACT_AFTER = 25
+# Reports and index rebuilds read the log this many rows at a time, so their
+# memory use depends on the batch size rather than on the length of the history.
+LOG_CHUNK_ROWS = 50000
+
+# Serializes access to the data files between threads and between processes
+_write_lock = DataLock(LOCK_FILE, timeout=LOCK_TIMEOUT)
+_overwrites_since_compact = 0
+_session_indexes = {} # {log path: session index}
+_storage_config = None
+_storage_config_sig = None
+_database_store = None
+_report_summaries = {} # {batch: (batch signature, BatchSummary)}
+_save_listeners = []   # Called as fn(batch_name, attendance_date) after every save
+_alert_book = None     # AlertBook, loaded from ALERTS_FILE on first use
+_alert_book_sig = None # Signatures of ALERTS_FILE and its journal when _alert_book was last read or written
+_alert_journal = {'pos': 0, 'lines': 0} # How much of ALERTS_JOURNAL_FILE _alert_book holds
+_alert_changes = []    # Changes to _alert_book not yet in either file, see _append_alert_journal()
+_roster_indexes = {}   # {batch: RosterIndex}
+
+# --- Error reporting ---
+# data_manager is used by the Tk app and by the headless CLI, so it never
+# talks to Tk directly. Errors go through the handler below, which shows a
+# message box by default; cli.py installs one that prints to stderr.
+
+def _messagebox_error(title, message):
+    from tkinter import messagebox
+    messagebox.showerror(title, message)
+
+_error_handler = _messagebox_error
+
+def set_error_handler(handler):
+    """Sets handler(title, message) to be called for every reported error."""
+    global _error_handler
+    _error_handler = handler
+
+def report_error(title, message):
+    _error_handler(title, message)
 
 # --- NEW FUNCTION ---
 def setup_files():
     """Checks for data files and creates them if they don't exist."""
     
+    # SQLite engine: everything lives in DATABASE_FILE, created on first use.
+    # The dummy students.json is only needed if the database has no roster yet.
+    has_roster = False
+    if _use_sqlite():
+        try:
+            has_roster = bool(_database().batches())
+        except Exception as e:
+            report_error("Setup Error", f"Could not open {DATABASE_FILE}: {e}")
+            return
+
     # 1. Check for students.json
-    if not os.path.exists(STUDENTS_FILE):
+    if not os.path.exists(STUDENTS_FILE) and not has_roster:
         # --- CHANGED ---
         # Data structure now includes roll numbers
         dummy_students = {
@@ -98,143 +197,1433 @@ def setup_files():
             with open(STUDENTS_FILE, 'w') as f:
                 json.dump(dummy_students, f, indent=4)
         except Exception as e:
-            messagebox.showerror("Setup Error", f"Could not create {STUDENTS_FILE}: {e}")
+            report_error("Setup Error", f"Could not create {STUDENTS_FILE}: {e}")
 
-    # 2. Check for attendance.csv
-    if not os.path.exists(ATTENDANCE_FILE):
+    # 2. Check for attendance storage
+    if _use_sqlite():
+        return
+    if load_storage_config()['layout'] == 'partitioned':
+        # Partition files are created on the first save of each batch
+        try:
+            os.makedirs(ATTENDANCE_DIR, exist_ok=True)
+        except Exception as e:
+            report_error("Setup Error", f"Could not create {ATTENDANCE_DIR}: {e}")
+    elif not os.path.exists(_single_log_path()):
         try:
             # --- CHANGED ---
             # Added 'roll_no' to the headers
-            headers = pd.DataFrame(columns=['roll_no', 'student_name', 'status', 'date', 'batch'])
-            headers.to_csv(ATTENDANCE_FILE, index=False)
+            _backend().create(_single_log_path())
         except Exception as e:
-            messagebox.showerror("Setup Error", f"Could not create {ATTENDANCE_FILE}: {e}")
+            report_error("Setup Error", f"Could not create {_single_log_path()}: {e}")
+
+# --- Roster cache ---
+
+class RosterCache:
+    """
+    Parsed contents of STUDENTS_FILE, kept in memory between calls.
+    The file is re-parsed only when its size or mtime changes, or after
+    invalidate(). 'version' goes up every time the roster is (re)loaded.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._batches = {}   # {batch: [student dicts]}
+        self._by_roll = {}   # {batch: {roll: student dict}}
+
+    def invalidate(self):
+        """Forces the next lookup to re-read the file."""
+        with self._lock:
+            self._signature = None
+
+    def _load(self):
+        """Returns the batch dict, re-parsing the file if it changed on disk."""
+        with self._lock:
+            st = os.stat(self.path) # Raises FileNotFoundError like open() did
+            signature = (st.st_size, st.st_mtime_ns)
+            if signature != self._signature:
+                with instrument.span('roster.json_load', bytes=st.st_size) as sp, open(self.path, 'r') as f:
+                    data = json.load(f)
+                    sp.set(batches=len(data))
+                self._batches = data
+                self._by_roll = {
+                    batch: {str(s['roll']): s for s in students}
+                    for batch, students in data.items()
+                }
+                self._signature = signature
+                self.version += 1
+            return self._batches
+
+    def batches(self):
+        return dict(self._load())
+
+    def students(self, batch_name):
+        return list(self._load().get(batch_name, []))
+
+    def student(self, batch_name, roll_no):
+        self._load()
+        return self._by_roll.get(batch_name, {}).get(str(roll_no))
+
+roster_cache = RosterCache(STUDENTS_FILE)
+
+def _roster():
+    """The roster source of the configured engine (same interface as RosterCache)."""
+    return _database() if _use_sqlite() else roster_cache
 
 # --- Existing Functions ---
 
 def load_batches():
     """Loads batch names from the students file."""
     try:
-        with open(STUDENTS_FILE, 'r') as f:
-            data = json.load(f)
-            return data # Return the whole dict
+        return _roster().batches() # Return the whole dict
     except FileNotFoundError:
-        messagebox.showerror("Error", f"{STUDENTS_FILE} not found.")
+        report_error("Error", f"{STUDENTS_FILE} not found.")
         return {}
     except Exception as e:
-        messagebox.showerror("Error", f"Error loading batches: {e}")
+        report_error("Error", f"Error loading batches: {e}")
         return {}
 
 def get_students(batch_name):
     """Gets a list of student dicts ({roll, name}) for a batch."""
     try:
-        with open(STUDENTS_FILE, 'r') as f:
-            data = json.load(f)
-            # --- CHANGED ---
-            # This now returns the list of dictionaries
-            return data.get(batch_name, [])
+        # --- CHANGED ---
+        # This now returns the list of dictionaries
+        with instrument.span('get_students', batch=batch_name) as sp:
+            students = _roster().students(batch_name)
+            sp.set(rows=len(students))
+        return students
     except FileNotFoundError:
         return []
     except Exception as e:
-        messagebox.showerror("Error", f"Error getting students: {e}")
+        report_error("Error", f"Error getting students: {e}")
+        return []
+
+def get_student(batch_name, roll_no):
+    """Looks up one student dict of a batch by roll number, or None."""
+    try:
+        return _roster().student(batch_name, roll_no)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        report_error("Error", f"Error getting student: {e}")
+        return None
+
+def get_roster_index(batch_name):
+    """
+    Returns a RosterIndex over the students of a batch, for search by roll
+    number and name. Its 'students' list is what get_students returns. The
+    index is kept until the batch's roster changes.
+    """
+    students = get_students(batch_name)
+    index = _roster_indexes.get(batch_name)
+    if index is None or index.students != students:
+        with instrument.span('roster.build_index', rows=len(students)):
+            index = _roster_indexes[batch_name] = RosterIndex(students)
+    return index
+
+# --- Storage configuration ---
+
+def load_storage_config():
+    """
+    Returns the storage settings from STORAGE_CONFIG_FILE, falling back to
+    defaults. The file is re-read when it changes, so a migration or backend
+    conversion done by another process is picked up before the next write.
+    """
+    global _storage_config, _storage_config_sig
+    signature = _log_signature(STORAGE_CONFIG_FILE)
+    if _storage_config is None or signature != _storage_config_sig:
+        config = dict(DEFAULT_STORAGE_CONFIG)
+        try:
+            with open(STORAGE_CONFIG_FILE, 'r') as f:
+                config.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            report_error("Error", f"Ignoring invalid {STORAGE_CONFIG_FILE}: {e}")
+        if _storage_config is not None and config != _storage_config:
+            _session_indexes.clear()
+        _storage_config, _storage_config_sig = config, signature
+    return _storage_config
+
+def save_storage_config(**changes):
+    """Updates and persists the storage settings."""
+    global _storage_config, _storage_config_sig
+    config = dict(load_storage_config())
+    config.update(changes)
+    tmp_file = STORAGE_CONFIG_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(config, f, indent=4)
+    os.replace(tmp_file, STORAGE_CONFIG_FILE)
+    _storage_config, _storage_config_sig = config, _log_signature(STORAGE_CONFIG_FILE)
+    _session_indexes.clear()
+    return config
+
+def _use_sqlite():
+    return load_storage_config()['engine'] == 'sqlite'
+
+def _database():
+    """
+    Returns the SQLite store. If students.json exists and changed since it
+    was last imported, the roster in the database is refreshed from it first,
+    so editing students.json keeps working with the SQLite engine.
+    """
+    global _database_store
+    if _database_store is None or _database_store.path != DATABASE_FILE:
+        _database_store = SqliteStore(DATABASE_FILE, timeout=LOCK_TIMEOUT)
+    source = _log_signature(STUDENTS_FILE)
+    if source is not None and json.dumps(source) != _database_store.get_meta('roster_source'):
+        with open(STUDENTS_FILE, 'r') as f:
+            _database_store.import_roster(json.load(f), source=json.dumps(source))
+    return _database_store
+
+def _backend():
+    """Returns the storage backend selected in the storage config."""
+    return get_backend(load_storage_config()['backend'])
+
+# --- Partitions ---
+# With the 'single' layout every batch lives in ATTENDANCE_FILE. With the
+# 'partitioned' layout each batch gets its own directory under ATTENDANCE_DIR
+# holding either one 'all.csv' or one 'YYYY-MM.csv' per month. Every
+# partition file is an independent append-only log with its own index.
+# Columnar backends use the same names with their own extension.
+
+def _is_partitioned():
+    return load_storage_config()['layout'] == 'partitioned'
+
+def _single_log_path():
+    """Returns the log file of the 'single' layout for the active backend."""
+    backend = _backend()
+    if backend.name == 'csv':
+        return ATTENDANCE_FILE
+    return os.path.splitext(ATTENDANCE_FILE)[0] + backend.extension
+
+def _batch_dir(batch_name):
+    return os.path.join(ATTENDANCE_DIR, quote(str(batch_name), safe=' '))
+
+def _partition_path(batch_name, attendance_date):
+    """Returns the log file that holds the given session."""
+    if not _is_partitioned():
+        return _single_log_path()
+    part = str(attendance_date)[:7] if load_storage_config()['partition_by_month'] else 'all'
+    return os.path.join(_batch_dir(batch_name), part + _backend().extension)
+
+def _batch_partitions(batch_name):
+    """Returns every existing log file that may hold sessions of a batch."""
+    if not _is_partitioned():
+        path = _single_log_path()
+        return [path] if os.path.exists(path) else []
+    batch_dir = _batch_dir(batch_name)
+    if not os.path.isdir(batch_dir):
+        return []
+    return [os.path.join(batch_dir, name) for name in sorted(os.listdir(batch_dir))
+            if name.endswith(_backend().extension)]
+
+def _all_partitions():
+    """Returns every existing attendance log file."""
+    if not _is_partitioned():
+        path = _single_log_path()
+        return [path] if os.path.exists(path) else []
+    if not os.path.isdir(ATTENDANCE_DIR):
         return []
+    paths = []
+    for batch_dir in sorted(os.listdir(ATTENDANCE_DIR)):
+        paths.extend(_batch_partitions(unquote(batch_dir)))
+    return paths
+
+# --- Attendance log helpers ---
+
+def _append_rows(path, df):
+    """
+    Appends rows to an attendance log without touching existing rows.
+    Backends that cannot append rewrite the file with the log folded instead;
+    returns True in that case, since row offsets in the index have moved.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    backend = _backend()
+    if backend.appendable:
+        backend.append(path, df)
+        return False
+    old_df = backend.read(path) if os.path.exists(path) else pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+    backend.write(path, _fold_log(pd.concat([old_df, df[ATTENDANCE_COLUMNS]], ignore_index=True)))
+    return True
+
+def _fold_log(df):
+    """
+    Applies tombstones to raw log rows: for every (date, batch) session only the
+    rows written after its last tombstone survive. Tombstones themselves are dropped.
+    """
+    is_tomb = df['status'] == TOMBSTONE_STATUS
+    if not is_tomb.any():
+        return df.reset_index(drop=True)
+
+    pos = pd.Series(range(len(df)), index=df.index)
+    key = df['batch'].astype(str) + '\x1f' + df['date'].astype(str)
+    last_tomb = pos[is_tomb].groupby(key[is_tomb]).max()
+    cutoff = key.map(last_tomb)
+    # Rows with no tombstone get NaN as cutoff, and NaN comparisons are False
+    superseded = pos <= cutoff
+    return df[~is_tomb & ~superseded].reset_index(drop=True)
+
+def _read_log(path, usecols=None):
+    """Reads a raw attendance log (tombstones included) with every column as text."""
+    return _backend().read(path, usecols=usecols)
+
+def _read_log_chunks(path, usecols=None):
+    """
+    Yields a raw log in chunks of LOG_CHUNK_ROWS rows, in file order. Each
+    chunk has an extra 'pos' column with the row's position in the log.
+    """
+    offset = 0
+    for chunk in _backend().read_chunks(path, LOG_CHUNK_ROWS, usecols=usecols):
+        chunk = chunk.reset_index(drop=True)
+        chunk['pos'] = range(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+def _fold_chunk(chunk):
+    """
+    Folds one chunk of a log read front to back. Returns the (batch, date)
+    sessions replaced by a tombstone in this chunk (their rows from earlier
+    chunks must be dropped by the caller) and the live rows of the chunk.
+    """
+    is_tomb = chunk['status'] == TOMBSTONE_STATUS
+    replaced = set(zip(chunk.loc[is_tomb, 'batch'], chunk.loc[is_tomb, 'date']))
+    return replaced, _fold_log(chunk)
+
+def load_attendance(batch_name=None):
+    """
+    Returns the live attendance rows, i.e. the log with overwrites applied.
+    If batch_name is given only that batch's partitions are read.
+    """
+    if _use_sqlite():
+        return _database().load_rows(batch_name)
+    paths = _all_partitions() if batch_name is None else _batch_partitions(batch_name)
+    frames = [_fold_log(_read_log(path)) for path in paths]
+    if not frames:
+        return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if batch_name is not None and not _is_partitioned():
+        df = df[df['batch'] == batch_name].reset_index(drop=True)
+    return df
+
+# --- Session index ---
+# Every log file has a sidecar index mapping batch -> date -> [row offset,
+# row count] of the live rows of each session, plus the log's size/mtime at
+# the time it was built and whether every session's rows are contiguous. If
+# the log changes behind our back (another program, manual edit) the
+# signature no longer matches and the index is rebuilt.
+# A save does not rewrite the index file, which grows with the history: it
+# appends the sessions it changed, with the log's new signature, as one JSON
+# line to a journal next to it. Loading replays the journal over the index
+# file; rebuilds and every SESSION_JOURNAL_LIMIT saves write a fresh index
+# file and start a new journal.
+
+def _index_file(path):
+    if path == _single_log_path():
+        return SESSION_INDEX_FILE
+    return os.path.splitext(path)[0] + '.index.json'
+
+def _journal_file(path):
+    return _index_file(path) + 'l'
+
+def _log_signature(path):
+    """Returns [size, mtime_ns] of an attendance log, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def _build_session_index(path):
+    """Scans a log once and returns a fresh session index for it."""
+    sessions = {}
+    last_pos = {} # {(batch, date): position of the session's last live row}
+    rows = 0
+    if os.path.exists(path):
+        for chunk in _read_log_chunks(path, usecols=['status', 'date', 'batch']):
+            rows += len(chunk)
+            replaced, live = _fold_chunk(chunk)
+            for batch, date_ in replaced:
+                sessions.get(batch, {}).pop(date_, None)
+                last_pos.pop((batch, date_), None)
+            live = live.groupby(['batch', 'date'])['pos'].agg(['min', 'max', 'count'])
+            for (batch, date_), (offset, last, count) in live.iterrows():
+                entry = sessions.setdefault(batch, {}).setdefault(date_, [int(offset), 0])
+                entry[1] += int(count)
+                last_pos[(batch, date_)] = int(last)
+        sessions = {batch: dates for batch, dates in sessions.items() if dates}
+    # Everything this module writes keeps a session's live rows together, but a
+    # hand-edited log may not; range reads (see _read_log_ranges) need them to be.
+    contiguous = all(last_pos[(batch, date_)] - offset + 1 == count
+                     for batch, dates in sessions.items() for date_, (offset, count) in dates.items())
+    return {'signature': _log_signature(path), 'rows': rows, 'sessions': sessions, 'contiguous': contiguous}
+
+def _write_session_index(path, index):
+    """Writes the whole index file; the journal it replaces is removed first."""
+    index_file = _index_file(path)
+    if os.path.exists(_journal_file(path)):
+        os.remove(_journal_file(path))
+    index['journal'] = 0
+    tmp_file = index_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        # json.dumps uses the C encoder; json.dump(index, f) streams through
+        # the much slower pure-Python one, which dominated the cost of a save
+        f.write(json.dumps(index))
+    os.replace(tmp_file, index_file)
+
+def _remove_session_index(path):
+    for index_file in (_journal_file(path), _index_file(path)):
+        if os.path.exists(index_file):
+            os.remove(index_file)
+
+def _apply_index_change(index, change):
+    """Applies one journal entry: {signature, rows, sessions: {batch: {date: [offset, count] or None}}}."""
+    for batch, dates in change['sessions'].items():
+        entries = index['sessions'].setdefault(batch, {})
+        for date_, entry in dates.items():
+            if entry is None:
+                entries.pop(date_, None)
+            else:
+                entries[date_] = entry
+    index['rows'] = change['rows']
+    index['signature'] = change['signature']
+
+def _load_session_index(path):
+    """Reads the index file of a log and replays its journal; None if there is neither."""
+    index = None
+    if os.path.exists(_index_file(path)):
+        with open(_index_file(path), 'r') as f:
+            index = json.load(f)
+    if os.path.exists(_journal_file(path)):
+        if index is None: # The log was created after the index file was last written
+            index = {'signature': None, 'rows': 0, 'sessions': {}, 'contiguous': True}
+        index['journal'] = 0
+        with open(_journal_file(path), 'r') as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    break # Cut short by a crash; the signature then no longer matches the log
+                _apply_index_change(index, change)
+                index['journal'] += 1
+    return index
+
+def _get_session_index(path):
+    """
+    Returns the session index of a log, loading it from disk or rebuilding it
+    when it has drifted from the log. Callers must hold _write_lock.
+    """
+    signature = _log_signature(path)
+    index = _session_indexes.get(path)
+    # Another process may have written the log (and its index) since we cached it
+    if index is None or index.get('signature') != signature:
+        try:
+            index = _load_session_index(path)
+        except (OSError, ValueError):
+            index = None
+    # Indexes written before 'contiguous' existed are rebuilt once
+    if index is None or index.get('signature') != signature or 'contiguous' not in index:
+        index = _build_session_index(path)
+        if signature is not None:
+            _write_session_index(path, index)
+        else: # The index of a deleted log must not be replayed under a new one
+            _remove_session_index(path)
+    _session_indexes[path] = index
+    return index
+
+def _record_append(path, index, new_df):
+    """Updates the index after new_df has been appended to the log at path, through its journal."""
+    offset = index['rows']
+    sessions = {}
+    for (batch, date_), group in new_df.groupby(['batch', 'date'], sort=False):
+        live = group[group['status'] != TOMBSTONE_STATUS]
+        first = offset + int(group.index[0]) + (len(group) - len(live))
+        sessions.setdefault(batch, {})[date_] = [first, len(live)] if len(live) else None
+    change = {'signature': _log_signature(path), 'rows': offset + len(new_df), 'sessions': sessions}
+    _apply_index_change(index, change)
+    if index.get('journal', 0) >= SESSION_JOURNAL_LIMIT:
+        _write_session_index(path, index)
+        return
+    with open(_journal_file(path), 'a') as f:
+        f.write(json.dumps(change) + '\n')
+    index['journal'] = index.get('journal', 0) + 1
+
+def _session_exists(attendance_date, batch_name):
+    """Checks whether a (date, batch) session has live rows in the log."""
+    if _use_sqlite():
+        return _database().session_exists(attendance_date, batch_name)
+    path = _partition_path(batch_name, attendance_date)
+    return attendance_date in _get_session_index(path)['sessions'].get(batch_name, {})
+
+def session_exists(attendance_date, batch_name):
+    """Public, locked version of _session_exists."""
+    with _write_lock:
+        return _session_exists(attendance_date, batch_name)
+
+def get_session_dates(batch_name):
+    """Returns the sorted list of dates that have attendance saved for a batch."""
+    if _use_sqlite():
+        return _database().session_dates(batch_name)
+    with _write_lock:
+        dates = set()
+        for path in _batch_partitions(batch_name):
+            dates.update(_get_session_index(path)['sessions'].get(batch_name, {}))
+        return sorted(dates)
+
+def _has_attendance_data():
+    """
+    True if at least one session has been saved in any batch.
+    Callers must hold _write_lock.
+    """
+    if _use_sqlite():
+        return _database().has_attendance()
+    return any(_get_session_index(path)['sessions'] for path in _all_partitions())
+
+# --- Report summaries ---
+# get_report_data works from a BatchSummary per batch that is kept in memory.
+# A summary is valid as long as the logs of its batch still have the
+# signature they had when it was built. save_attendance patches the saved
+# batch's summary in place and re-stamps the signatures of the others, so a
+# save never forces a rebuild from the log.
+
+def _batch_signature(batch_name):
+    if _use_sqlite():
+        return ('sqlite', _database().revision(batch_name))
+    return tuple((path, tuple(_log_signature(path) or ())) for path in _batch_partitions(batch_name))
+
+def _build_batch_summary(batch_name):
+    return _build_batch_summaries([batch_name])[batch_name]
+
+def _build_batch_summaries(batch_names):
+    """
+    Builds the summaries of several batches by streaming over their logs
+    once, so a log shared by many batches is read one time, not once per
+    batch, and only one chunk of it is in memory at a time next to the
+    summaries. Only reads files: it is safe without _write_lock if the
+    caller checks afterwards that the batches did not change meanwhile.
+    """
+    batch_names = list(dict.fromkeys(batch_names))
+    with instrument.span('report.build_summary', batches=len(batch_names)) as sp:
+        summaries = {batch_name: BatchSummary() for batch_name in batch_names}
+        rows = 0
+        if _use_sqlite():
+            for batch_name in batch_names: # One indexed range scan each
+                df = _database().load_rows(batch_name)
+                rows += len(df)
+                summaries[batch_name].merge_rows(df)
+            sp.set(rows=rows)
+            return summaries
+        paths = dict.fromkeys(path for batch_name in batch_names for path in _batch_partitions(batch_name))
+        for path in paths:
+            for chunk in _read_log_chunks(path):
+                rows += len(chunk)
+                replaced, live = _fold_chunk(chunk[chunk['batch'].isin(summaries)])
+                for batch_name, date_ in replaced:
+                    summaries[batch_name].remove_session(date_)
+                for batch_name, batch_rows in live.groupby('batch', sort=False):
+                    summaries[batch_name].merge_rows(batch_rows)
+        sp.set(rows=rows)
+        return summaries
+
+def _get_batch_summary(batch_name):
+    """Returns the up to date summary of a batch. Callers must hold _write_lock."""
+    signature = _batch_signature(batch_name)
+    cached = _report_summaries.get(batch_name)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    summary = _build_batch_summary(batch_name)
+    _report_summaries[batch_name] = (signature, summary)
+    return summary
+
+def _restamp_summaries(path, old_sig, new_sig):
+    """
+    Carries valid summaries (and alert counters) over a write to path that
+    did not change their batch.
+    """
+    old_entry, new_entry = (path, tuple(old_sig or ())), (path, tuple(new_sig or ()))
+    restamp = lambda signature: tuple(new_entry if entry == old_entry else entry for entry in signature)
+    for batch, (signature, summary) in list(_report_summaries.items()):
+        if old_entry in signature:
+            _report_summaries[batch] = (restamp(signature), summary)
+    if _restamp_alert_versions(_get_alert_book(), path, old_sig, new_sig):
+        _alert_changes.append({'restamp': [path, list(old_sig or ()), list(new_sig or ())]})
+
+def _restamp_alert_versions(book, path, old_sig, new_sig):
+    """The alert counters' part of _restamp_summaries; returns True if any version changed."""
+    old_entry, new_entry = (path, tuple(old_sig or ())), (path, tuple(new_sig or ()))
+    restamped = False
+    for batch, version in book.versions.items():
+        if version and old_entry in version:
+            book.versions[batch] = tuple(new_entry if entry == old_entry else entry for entry in version)
+            restamped = True
+    return restamped
+
+def clear_report_cache(batch_name=None):
+    """
+    Drops the in-memory summary of one batch (or of every batch). The next
+    report for it rebuilds the summary from the log.
+    """
+    with _write_lock:
+        if batch_name is None:
+            _report_summaries.clear()
+        else:
+            _report_summaries.pop(batch_name, None)
+
+def compact_attendance():
+    """
+    Folds every attendance log: rewrites it with tombstones and the rows they
+    replaced removed. The rewrite goes to a temp file that is then swapped in,
+    so readers never see a half-written log.
+    With the SQLite engine this vacuums the database instead.
+    """
+    global _overwrites_since_compact
+    with _write_lock:
+        if _use_sqlite():
+            try:
+                _database().vacuum()
+                return True, f"Vacuumed {DATABASE_FILE}."
+            except Exception as e:
+                return False, f"An error occurred while compacting: {e}"
+        try:
+            removed = 0
+            for path in _all_partitions():
+                raw_df = _read_log(path)
+                folded_df = _fold_log(raw_df)
+                if len(folded_df) == len(raw_df):
+                    continue
+                removed += len(raw_df) - len(folded_df)
+                old_sig = _log_signature(path)
+                _backend().write(path, folded_df)
+                # Same live rows, so summaries of this log stay valid
+                _restamp_summaries(path, old_sig, _log_signature(path))
+                # Row offsets have moved, so the index has to be rebuilt
+                _session_indexes.pop(path, None)
+                _get_session_index(path)
+            _overwrites_since_compact = 0
+            _write_alert_book()
+            return True, f"Compaction removed {removed} superseded rows."
+        except Exception as e:
+            return False, f"An error occurred while compacting: {e}"
+
+def compact_attendance_async():
+    """Runs compact_attendance in a daemon thread; returns the thread."""
+    thread = threading.Thread(target=compact_attendance, name="attendance-compaction", daemon=True)
+    thread.start()
+    return thread
+
+def migrate_to_partitioned(partition_by_month=False):
+    """
+    One-shot migration from the single ATTENDANCE_FILE to the partitioned
+    layout. The old file is kept with a '.migrated' suffix.
+    """
+    with _write_lock:
+        if _use_sqlite():
+            return False, "Attendance data is stored in SQLite; partitioning does not apply."
+        if _is_partitioned():
+            return False, "Attendance data is already partitioned."
+        try:
+            single_path = _single_log_path()
+            df = _fold_log(_read_log(single_path)) if os.path.exists(single_path) \
+                else pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+            if os.path.isdir(ATTENDANCE_DIR) and os.listdir(ATTENDANCE_DIR):
+                return False, f"{ATTENDANCE_DIR} already exists and is not empty."
+
+            save_storage_config(layout='partitioned', partition_by_month=partition_by_month)
+            os.makedirs(ATTENDANCE_DIR, exist_ok=True)
+            session_paths = {}
+            for key in zip(df['batch'], df['date']):
+                if key not in session_paths:
+                    session_paths[key] = _partition_path(*key)
+            paths = pd.Series([session_paths[key] for key in zip(df['batch'], df['date'])],
+                              index=df.index, dtype=object)
+            for path, part_df in df.groupby(paths, sort=False):
+                _append_rows(path, part_df)
+                _get_session_index(path)
+
+            if os.path.exists(single_path):
+                os.replace(single_path, single_path + '.migrated')
+            _remove_session_index(single_path)
+            return True, f"Migrated {len(df)} rows into {paths.nunique()} partitions."
+        except Exception as e:
+            save_storage_config(layout='single')
+            return False, f"An error occurred while migrating: {e}"
+
+def convert_storage_backend(backend_name):
+    """
+    Rewrites every attendance log in another backend's format (e.g. 'csv' to
+    'parquet' and back) and switches the storage config over to it.
+    """
+    with _write_lock:
+        if _use_sqlite():
+            return False, "Attendance data is stored in SQLite; file backends do not apply."
+        source = _backend()
+        try:
+            target = get_backend(backend_name)
+        except ValueError as e:
+            return False, str(e)
+        if target is source:
+            return False, f"Attendance data is already stored as '{backend_name}'."
+
+        try:
+            converted = []
+            for path in _all_partitions():
+                new_path = os.path.splitext(path)[0] + target.extension
+                target.write(new_path, _fold_log(source.read(path)))
+                converted.append((path, new_path))
+        except Exception as e:
+            for _, new_path in converted:
+                if os.path.exists(new_path):
+                    os.remove(new_path)
+            return False, f"An error occurred while converting: {e}"
+
+        for path, _ in converted:
+            os.remove(path)
+            _remove_session_index(path)
+        save_storage_config(backend=backend_name)
+        return True, f"Converted {len(converted)} attendance files to '{backend_name}'."
+
+def migrate_to_sqlite():
+    """
+    One-shot migration of students.json and the attendance logs (any layout
+    and backend) into DATABASE_FILE, then switches the storage config to the
+    SQLite engine. The old files are left in place but no longer read;
+    students.json is still re-imported whenever it is edited.
+    """
+    with _write_lock:
+        if _use_sqlite():
+            return False, "Attendance data is already stored in SQLite."
+        if os.path.exists(DATABASE_FILE):
+            return False, f"{DATABASE_FILE} already exists."
+        store = SqliteStore(DATABASE_FILE, timeout=LOCK_TIMEOUT)
+        try:
+            roster = roster_cache.batches() if os.path.exists(STUDENTS_FILE) else {}
+            df = load_attendance()
+            store.import_roster(roster, source=json.dumps(_log_signature(STUDENTS_FILE)))
+            store.import_attendance(df)
+            store.close()
+        except Exception as e:
+            store.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(DATABASE_FILE + suffix):
+                    os.remove(DATABASE_FILE + suffix)
+            return False, f"An error occurred while migrating: {e}"
+        save_storage_config(engine='sqlite')
+        _report_summaries.clear()
+        students = sum(len(s) for s in roster.values())
+        return True, f"Migrated {students} students and {len(df)} attendance rows into {DATABASE_FILE}."
+
+def add_save_listener(listener):
+    """Registers listener(batch_name, attendance_date), called after every successful save."""
+    if listener not in _save_listeners:
+        _save_listeners.append(listener)
+
+def remove_save_listener(listener):
+    if listener in _save_listeners:
+        _save_listeners.remove(listener)
+
+def _notify_saved(batch_name, attendance_date):
+    for listener in list(_save_listeners):
+        try:
+            listener(batch_name, attendance_date)
+        except Exception:
+            pass # A broken listener must not turn a successful save into an error
+
+def get_roster_version():
+    """
+    Returns an opaque value that changes whenever the roster (the batches
+    and their students) changes. Cheap enough to call on every refresh.
+    """
+    if _use_sqlite():
+        return ('sqlite', _database().get_meta('roster_source'))
+    try:
+        roster_cache.batches() # Reloads the roster if the file changed
+    except Exception: # Missing or broken file; load_batches() reports it
+        return ('files', None)
+    return ('files', roster_cache.version)
+
+def get_data_version(batch_name):
+    """
+    Returns an opaque value that changes whenever the attendance of a batch
+    or the student roster changes. Used as a cache key for rendered output.
+    """
+    get_students(batch_name) # Reloads the roster if the file changed
+    if _use_sqlite():
+        return _batch_signature(batch_name) # Covers roster changes too
+    with _write_lock:
+        return (_batch_signature(batch_name), roster_cache.version)
 
 def save_attendance(attendance_date, batch_name, records, overwrite=False):
     """
     Saves attendance records to the main CSV file.
     Assumes 'records' is a list of dicts:
     [{'roll_no': 'R1', 'student_name': 'S1', 'status': 'P'}, ...]
+
+    New sessions are appended to the log. An overwrite appends a tombstone
+    followed by the replacement rows, so existing rows are never rewritten here.
     """
-    # --- CHANGED ---
-    # The DataFrame will now automatically include 'roll_no' if it's in 'records'
-    new_df = pd.DataFrame(records)
-    new_df['date'] = attendance_date
-    new_df['batch'] = batch_name
-    
+    return save_attendance_bulk([(attendance_date, batch_name, records)], overwrite=overwrite)[0]
+
+def _is_iso_date(value):
+    """True for a real date written as YYYY-MM-DD; the partitioned layout files sessions by its first 7 characters."""
     try:
-        if os.path.exists(ATTENDANCE_FILE):
-            main_df = pd.read_csv(ATTENDANCE_FILE)
-            exists = ((main_df['date'] == attendance_date) & 
-                      (main_df['batch'] == batch_name)).any()
-            
-            if exists:
-                if not overwrite:
-                    return False, "Attendance for this date and batch already exists."
-                main_df = main_df.drop(
-                    main_df[(main_df['date'] == attendance_date) & (main_df['batch'] == batch_name)].index
-                )
-        else:
+        return isinstance(value, str) and datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d") == value
+    except ValueError:
+        return False
+
+def save_attendance_bulk(sessions, overwrite=False):
+    """
+    Saves many sessions at once, e.g. to backfill a term or import from
+    another system. sessions is an iterable of (date, batch, records) with
+    records as in save_attendance. Dates are 'YYYY-MM-DD' strings; a session
+    with any other date is refused. Returns one (success, message) per
+    session, in order.
+
+    All sessions are checked against the index together. The accepted ones
+    are then written in one pass: one append (or rewrite) per log file, or
+    one transaction with the SQLite engine. A session listed twice is only
+    saved the first time.
+    """
+    sessions = list(sessions)
+    with instrument.span('save_attendance', sessions=len(sessions)) as sp:
+        return _save_attendance_bulk(sessions, overwrite, sp)
+
+def _save_attendance_bulk(sessions, overwrite, sp):
+    results = [None] * len(sessions)
+    frames = {}  # {i: DataFrame of session i}
+    seen = set()
+    with instrument.span('save.frames'):
+        for i, (attendance_date, batch_name, records) in enumerate(sessions):
+            if not _is_iso_date(attendance_date):
+                results[i] = (False, f"Invalid date '{attendance_date}'. Please use YYYY-MM-DD.")
+                continue
+            if (attendance_date, batch_name) in seen:
+                results[i] = (False, "This session appears more than once in the request.")
+                continue
+            seen.add((attendance_date, batch_name))
             # --- CHANGED ---
-            # Ensure new DataFrame has the 'roll_no' column
-            main_df = pd.DataFrame(columns=['roll_no', 'student_name', 'status', 'date', 'batch'])
+            # The DataFrame will now automatically include 'roll_no' if it's in 'records'
+            new_df = pd.DataFrame(records, columns=['roll_no', 'student_name', 'status'])
+            new_df['date'] = attendance_date
+            new_df['batch'] = batch_name
+            frames[i] = new_df
+    if not frames:
+        return results
+    sp.set(rows=sum(len(df) for df in frames.values()))
 
-        final_df = pd.concat([main_df, new_df], ignore_index=True)
-        final_df.to_csv(ATTENDANCE_FILE, index=False)
-        return True, "Attendance saved successfully."
-    
+    try:
+        with instrument.span('save.lock_wait'):
+            _write_lock.acquire()
+        try:
+            saved = (_save_sessions_sqlite if _use_sqlite() else _save_sessions_files)(sessions, frames, overwrite)
+        finally:
+            _write_lock.release()
     except Exception as e:
-        return False, f"An error occurred while saving: {e}"
+        saved = {}
+        for i in frames:
+            results[i] = (False, f"An error occurred while saving: {e}")
+
+    for i in frames:
+        if i in saved:
+            results[i] = (True, "Attendance saved successfully.")
+        elif results[i] is None:
+            results[i] = (False, "Attendance for this date and batch already exists.")
+
+    sp.set(saved=len(saved))
+    if _overwrites_since_compact >= AUTO_COMPACT_AFTER:
+        compact_attendance_async()
+    with instrument.span('save.notify'):
+        for i in sorted(saved):
+            _notify_saved(sessions[i][1], sessions[i][0])
+    return results
+
+def _valid_summaries(batches):
+    """{batch: summary} of the cached summaries still valid for these batches."""
+    valid = {}
+    for batch_name in batches:
+        cached = _report_summaries.get(batch_name)
+        if cached and cached[0] == _batch_signature(batch_name):
+            valid[batch_name] = cached[1]
+    return valid
+
+def _apply_saved_sessions(summaries, batches, saved_sessions):
+    """
+    Patches the still valid summaries with the saved (date, batch, rows)
+    sessions and drops the others. Callers must hold _write_lock.
+    """
+    for batch_name in batches:
+        summary = summaries.get(batch_name)
+        if summary is None:
+            _report_summaries.pop(batch_name, None)
+            continue
+        for attendance_date, session_batch, new_df in saved_sessions:
+            if session_batch != batch_name:
+                continue
+            live_df = new_df[new_df['status'] != TOMBSTONE_STATUS]
+            summary.apply_session(attendance_date,
+                                  zip(live_df['roll_no'], live_df['student_name'], live_df['status']))
+        _report_summaries[batch_name] = (_batch_signature(batch_name), summary)
+
+def _save_sessions_files(sessions, frames, overwrite):
+    """
+    save_attendance_bulk for the file engine. Returns the set of saved
+    session numbers. Callers must hold _write_lock.
+    """
+    global _overwrites_since_compact
+    by_path = {}  # {log path: [session frames, tombstones included]}
+    saved = set()
+    saved_sessions = []
+    # Existence checks, loading the session indexes and alert book if needed
+    with instrument.span('save.check'):
+        tracked = _tracked_alert_batches({sessions[i][1] for i in frames})
+        summaries = _valid_summaries(tracked)
+        old_rows = {}  # {(date, batch): rows an overwrite replaces}, for the alert counters
+        for i, new_df in frames.items():
+            attendance_date, batch_name = sessions[i][0], sessions[i][1]
+            if _session_exists(attendance_date, batch_name):
+                if not overwrite:
+                    continue
+                if batch_name in summaries: # Spares reading the old rows from the log
+                    old_rows[(attendance_date, batch_name)] = summaries[batch_name].session_rows(attendance_date)
+                elif batch_name in tracked:
+                    old_df = _read_session(_partition_path(batch_name, attendance_date), batch_name, attendance_date)
+                    if old_df is None:
+                        tracked.discard(batch_name) # Recounted on the next get_alerts() instead
+                    else:
+                        old_rows[(attendance_date, batch_name)] = old_df
+                tombstone = pd.DataFrame([{
+                    'roll_no': '', 'student_name': '', 'status': TOMBSTONE_STATUS,
+                    'date': attendance_date, 'batch': batch_name
+                }])
+                new_df = pd.concat([tombstone, new_df], ignore_index=True)
+                _overwrites_since_compact += 1
+            by_path.setdefault(_partition_path(batch_name, attendance_date), []).append(new_df)
+            saved.add(i)
+            saved_sessions.append((attendance_date, batch_name, new_df))
+
+    batches = {sessions[i][1] for i in saved}
+    summaries = _valid_summaries(batches) # Still valid: nothing has been written yet
+    for path, session_frames in by_path.items():
+        index = _get_session_index(path)
+        old_sig = _log_signature(path)
+        path_df = pd.concat(session_frames, ignore_index=True)
+        with instrument.span('save.append', rows=len(path_df)) as sp:
+            if _append_rows(path, path_df):
+                sp.set(rewritten=True)
+                _session_indexes.pop(path, None)
+                _get_session_index(path)
+            else:
+                _record_append(path, index, path_df)
+        _restamp_summaries(path, old_sig, _log_signature(path))
+
+    with instrument.span('save.summaries', batches=len(batches)):
+        _apply_saved_sessions(summaries, batches, saved_sessions)
+    with instrument.span('save.alerts', batches=len(tracked)):
+        _update_alerts(tracked, batches, saved_sessions, old_rows)
+    return saved
+
+def _save_sessions_sqlite(sessions, frames, overwrite):
+    """save_attendance_bulk for the SQLite engine: one transaction for all sessions."""
+    store = _database()
+    batches = {sessions[i][1] for i in frames}
+    old_sigs = {batch_name: _batch_signature(batch_name) for batch_name in batches}
+    summaries = _valid_summaries(batches)
+    tracked = _tracked_alert_batches(batches)
+    requested = [(sessions[i][0], sessions[i][1], frames[i]) for i in frames]
+    old_rows = {}  # {(date, batch): rows an overwrite replaces}, for the alert counters
+    if overwrite:
+        with instrument.span('save.old_rows'):
+            for attendance_date, batch_name, _ in requested:
+                if batch_name in tracked:
+                    old_df = store.query_rows([batch_name], attendance_date, attendance_date)
+                    if not old_df.empty:
+                        old_rows[(attendance_date, batch_name)] = old_df
+    with instrument.span('save.transaction', sessions=len(requested)):
+        accepted, revisions = store.save_sessions(requested, overwrite)
+    # Patch a summary only if nobody else wrote to its batch in between
+    for batch_name, revision in revisions.items():
+        if revision != old_sigs[batch_name][1] + 1:
+            summaries.pop(batch_name, None)
+            tracked.discard(batch_name)
+    saved_sessions = [session for session, ok in zip(requested, accepted) if ok]
+    with instrument.span('save.summaries', batches=len(revisions)):
+        _apply_saved_sessions(summaries, set(revisions), saved_sessions)
+    with instrument.span('save.alerts', batches=len(tracked)):
+        _update_alerts(tracked, set(revisions), saved_sessions, old_rows)
+    return {i for i, ok in zip(frames, accepted) if ok}
+
+def _report_source(batch_name):
+    """
+    Returns (summary, roster_df, message) for a batch report, summary and
+    roster_df being None if there is nothing to report. Callers must not
+    hold _write_lock; the summary must only be used while holding it.
+    """
+    if _use_sqlite():
+        storage_path = DATABASE_FILE
+    else:
+        storage_path = ATTENDANCE_DIR if _is_partitioned() else _single_log_path()
+    if not os.path.exists(storage_path):
+        return None, None, "No attendance data file found."
+
+    with instrument.span('report.summary'), _write_lock:
+        summary = _get_batch_summary(batch_name)
+        # --- FIX: Handle case where attendance file exists but is empty ---
+        no_data = not summary.session_count and not _has_attendance_data()
+    if no_data:
+        return None, None, "No attendance data has been recorded yet."
+
+    # --- FIX: Ensure all students from the roster are included in the report ---
+    # 1. Get the full student roster for the batch
+    all_students = get_students(batch_name)
+    if not all_students:
+        return None, None, f"No students found in the roster for batch '{batch_name}'."
+
+    # Create a base DataFrame from the full roster
+    roster_df = pd.DataFrame(all_students).rename(columns={'roll': 'roll_no', 'name': 'student_name'})
+    # --- FIX: Ensure 'roll_no' is always treated as a string ---
+    # This prevents mismatches between roster and attendance roll numbers.
+    roster_df['roll_no'] = roster_df['roll_no'].astype(str)
+    return summary, roster_df, None
+
+def _finish_report(report_df):
+    """Gives a to_report() result the column names and order of the report."""
+    # --- CHANGED ---
+    # Rename columns for better readability
+    report_df = report_df.rename(columns={'student_name': 'Name', 'roll_no': 'Roll No.'})
+
+    # --- CHANGED ---
+    # Reorder columns to be more logical, putting Roll No. first
+    date_cols = [col for col in report_df.columns if col not in ['Roll No.', 'Name', 'Present', 'Absent', 'Total', 'Percent']]
+    final_cols = ['Roll No.', 'Name'] + date_cols + ['Present', 'Absent', 'Total', 'Percent']
+    return report_df[final_cols]
 
 def get_report_data(batch_name):
     """Loads and processes all attendance data for a specific batch."""
-    if not os.path.exists(ATTENDANCE_FILE):
-        return None, "No attendance data file found."
-
     try:
-        df = pd.read_csv(ATTENDANCE_FILE)
-        # --- FIX: Ensure 'roll_no' is always treated as a string ---
-        # This prevents dtype mismatch errors during merge.
-        df['roll_no'] = df['roll_no'].astype(str)
-        # --- FIX: Handle case where attendance file exists but is empty ---
-        if df.empty:
-            return None, "No attendance data has been recorded yet."
-            
-        # --- FIX: Ensure all students from the roster are included in the report ---
-        # 1. Get the full student roster for the batch
-        all_students = get_students(batch_name)
-        if not all_students:
-            return None, f"No students found in the roster for batch '{batch_name}'."
-
-        # Create a base DataFrame from the full roster
-        roster_df = pd.DataFrame(all_students).rename(columns={'roll': 'roll_no', 'name': 'student_name'})
-        # Also ensure the roster's roll_no is a string for consistency
-        roster_df['roll_no'] = roster_df['roll_no'].astype(str)
-
-        # Filter attendance data for the current batch
-        batch_df = df[df['batch'] == batch_name]
-
-        # If attendance data exists, pivot and merge it with the roster
-        if batch_df.empty:
-            # If no attendance records, the report is just the roster
-            report_df = roster_df
-        else:
-            # Pivot the existing attendance data
-            pivot_df = batch_df.pivot_table(
-                index=['roll_no', 'student_name'],
-                columns='date',
-                values='status',
-                aggfunc='first'
-            )
-            # Merge the roster with the pivoted data
-            report_df = pd.merge(roster_df, pivot_df, on=['roll_no', 'student_name'], how='left')
-
-        report_df['Present'] = (report_df == 'Present').sum(axis=1)
-        report_df['Absent'] = (report_df == 'Absent').sum(axis=1)
-        report_df['Total'] = report_df['Present'] + report_df['Absent']
-        # Use a safe division to prevent errors when Total is 0
-        report_df['Percent'] = (report_df['Present'].div(report_df['Total']).fillna(0) * 100).round(1)
+        with instrument.span('get_report_data', batch=batch_name) as sp:
+            summary, roster_df, message = _report_source(batch_name)
+            if summary is None:
+                return None, message
+
+            # The summary already holds this batch's status matrix and computes the
+            # Present/Absent counters from it, so this only walks the roster once.
+            with instrument.span('report.to_report', rows=len(roster_df)), _write_lock:
+                report_df = summary.to_report(roster_df)
+            with instrument.span('report.finish'):
+                report_df = _finish_report(report_df)
+            sp.set(rows=len(report_df), columns=len(report_df.columns))
 
-        # --- CHANGED ---
-        # Rename columns for better readability
-        report_df = report_df.rename(columns={'student_name': 'Name', 'roll_no': 'Roll No.'})
-        
-        # --- CHANGED ---
-        # Reorder columns to be more logical, putting Roll No. first
-        date_cols = [col for col in report_df.columns if col not in ['Roll No.', 'Name', 'Present', 'Absent', 'Total', 'Percent']]
-        final_cols = ['Roll No.', 'Name'] + date_cols + ['Present', 'Absent', 'Total', 'Percent']
-        report_df = report_df[final_cols]
-        
         return report_df, "Report generated successfully."
 
     except Exception as e:
         return None, f"Error generating report: {e}"
+
+def get_report_chunks(batch_name, chunk_rows):
+    """
+    Streaming variant of get_report_data, for exports. Returns (chunks,
+    rows, message): chunks yields the report as DataFrames of at most
+    chunk_rows students, all with the same columns, and rows is the number
+    of students; chunks is None if there is no report. The chunks come from
+    a snapshot of the batch summary, so saves can go on while they are
+    consumed and the whole report is never in memory at once.
+    """
+    try:
+        summary, roster_df, message = _report_source(batch_name)
+        if summary is None:
+            return None, 0, message
+        with _write_lock:
+            summary = summary.copy()
+    except Exception as e:
+        return None, 0, f"Error generating report: {e}"
+
+    def chunks():
+        for start in range(0, len(roster_df), chunk_rows):
+            yield _finish_report(summary.to_report(roster_df.iloc[start:start + chunk_rows]))
+    return chunks(), len(roster_df), "Report generated successfully."
+
+# --- Cross-batch queries ---
+# query_attendance reads only what a query can match: partitions of other
+# batches (and, with monthly partitions, of other months) are not opened, the
+# session index tells which row ranges of a log hold the wanted sessions, and
+# reading stops after the last of them. On SQLite it is one indexed query.
+
+QUERY_GROUP_COLUMNS = ['batch', 'date', 'roll_no', 'student_name']
+
+def _partition_in_range(path, start_date, end_date):
+    """False for a monthly partition that lies wholly outside [start_date, end_date]."""
+    month = os.path.splitext(os.path.basename(path))[0]
+    if len(month) != 7 or not _is_partitioned():
+        return True # 'all' partition or the single log
+    return (start_date is None or month >= start_date[:7]) and (end_date is None or month <= end_date[:7])
+
+def _read_log_ranges(path, ranges):
+    """
+    Returns the rows of a log at the given [offset, count] ranges. Chunks are
+    read front to back and reading stops after the last range.
+    """
+    ranges = sorted(ranges)
+    starts = np.array([offset for offset, _ in ranges])
+    ends = np.array([offset + count for offset, count in ranges])
+    stop = ends.max()
+    frames = []
+    for chunk in _read_log_chunks(path):
+        pos = chunk['pos'].to_numpy()
+        if pos[0] >= stop:
+            break
+        # The ranges do not overlap, so a row can only be in the last range starting at or before it
+        i = np.searchsorted(starts, pos, side='right') - 1
+        keep = (i >= 0) & (pos < ends[np.maximum(i, 0)])
+        if keep.any():
+            frames.append(chunk[keep])
+    return frames
+
+def _query_partition(path, batches, start_date, end_date):
+    """Returns the live rows of one log matching the batch and date filters, as a list of frames."""
+    index = _get_session_index(path)
+    ranges = [tuple(entry) for batch, dates in index['sessions'].items()
+              if batches is None or batch in batches
+              for date_, entry in dates.items()
+              if (start_date is None or date_ >= start_date) and (end_date is None or date_ <= end_date)]
+    if not ranges:
+        return []
+    if index['contiguous']:
+        return _read_log_ranges(path, ranges)
+    frames = []
+    for chunk in _read_log_chunks(path):
+        replaced, live = _fold_chunk(chunk)
+        if replaced:
+            keys = {batch + '\x1f' + date_ for batch, date_ in replaced}
+            frames = [f[~(f['batch'] + '\x1f' + f['date']).isin(keys)] for f in frames]
+        frames.append(live)
+    return [f[f['batch'].isin(batches)] if batches is not None else f for f in frames]
+
+def _aggregate_attendance(df, group_by):
+    """Present/Absent/Total/Percent per group, counted the way the report counts them."""
+    # A student marked twice on one day counts once, with the first status (as in the report)
+    df = df.drop_duplicates(subset=['batch', 'roll_no', 'student_name', 'date'], keep='first')
+    counts = pd.DataFrame({
+        'Present': (df['status'] == 'Present').astype(int),
+        'Absent': (df['status'] == 'Absent').astype(int),
+    })
+    result = counts.groupby([df[col] for col in group_by], sort=True).sum().reset_index()
+    result['Total'] = result['Present'] + result['Absent']
+    result['Percent'] = (result['Present'].div(result['Total']).fillna(0) * 100).round(1)
+    return result
+
+def _query_rows(batches, start_date=None, end_date=None, roll_nos=None):
+    """
+    Live rows matching the batch (set) and date filters; roll_nos is only
+    applied on SQLite, where it is part of the query. Callers must hold _write_lock.
+    """
+    if _use_sqlite():
+        return _database().query_rows(batches, start_date, end_date, roll_nos)
+    if batches is None:
+        paths = _all_partitions()
+    else:
+        paths = list(dict.fromkeys(path for batch in sorted(batches) for path in _batch_partitions(batch)))
+    frames = []
+    for path in paths:
+        if _partition_in_range(path, start_date, end_date):
+            frames.extend(_query_partition(path, batches, start_date, end_date))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+    df = df[ATTENDANCE_COLUMNS]
+    # Date filter again for the non-contiguous fallback, which reads whole logs
+    if start_date is not None:
+        df = df[df['date'] >= start_date]
+    if end_date is not None:
+        df = df[df['date'] <= end_date]
+    return df
+
+def _read_session(path, batch_name, attendance_date):
+    """
+    Live rows of one session, read through the session index; None if the
+    log is not laid out for range reads. Callers must hold _write_lock.
+    """
+    index = _get_session_index(path)
+    entry = index['sessions'].get(batch_name, {}).get(attendance_date)
+    if entry is None:
+        return pd.DataFrame(columns=ATTENDANCE_COLUMNS)
+    if not index['contiguous']:
+        return None
+    return pd.concat(_read_log_ranges(path, [entry]), ignore_index=True)
+
+def query_attendance(batches=None, start_date=None, end_date=None, roll_nos=None, group_by=None):
+    """
+    Returns live attendance rows across batches, filtered by batch names,
+    an inclusive 'YYYY-MM-DD' date range and roll numbers (None = no filter).
+    With group_by (one or more of QUERY_GROUP_COLUMNS) returns Present,
+    Absent, Total and Percent per group instead. Returns (df, message).
+    """
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    unknown = [col for col in group_by or [] if col not in QUERY_GROUP_COLUMNS]
+    if unknown:
+        return None, f"Cannot group by {', '.join(unknown)}."
+    batches = None if batches is None else {str(b) for b in batches}
+    roll_nos = None if roll_nos is None else {str(r) for r in roll_nos}
+    start_date = None if start_date is None else str(start_date)
+    end_date = None if end_date is None else str(end_date)
+
+    try:
+        with _write_lock:
+            df = _query_rows(batches, start_date, end_date, roll_nos)
+        if roll_nos is not None:
+            df = df[df['roll_no'].isin(roll_nos)]
+        df = df.reset_index(drop=True)
+        if group_by:
+            df = _aggregate_attendance(df, group_by)
+        return df, f"{len(df)} rows found."
+    except Exception as e:
+        return None, f"Error running query: {e}"
+
+def low_attendance(threshold=75.0, batches=None, start_date=None, end_date=None):
+    """
+    Returns (df, message) with every student whose attendance in the given
+    batches and date range is below threshold percent, lowest first.
+    """
+    df, message = query_attendance(batches, start_date, end_date,
+                                   group_by=['batch', 'roll_no', 'student_name'])
+    if df is None:
+        return None, message
+    df = df[df['Percent'] < threshold].sort_values(['Percent', 'batch', 'roll_no'], kind='stable')
+    return df.reset_index(drop=True), f"{len(df)} students below {threshold:g}%."
+
+# --- Attendance alerts ---
+# The AlertBook (alerts.py) is updated by every save of a batch it tracks,
+# i.e. a batch whose counters match its current data version. Batches that
+# changed some other way (another program without alert support, a manual
+# edit, a migration) are recounted by the next get_alerts().
+
+def _tuplify(value):
+    """Turns the lists of a version read back from JSON into the tuples it was made of."""
+    return tuple(_tuplify(item) for item in value) if isinstance(value, list) else value
+
+def _roster_signature():
+    """Like get_roster_version(), but stable across processes."""
+    if _use_sqlite():
+        return ('sqlite', _database().get_meta('roster_source'))
+    return ('files', _tuplify(_log_signature(STUDENTS_FILE)))
+
+def _get_alert_book():
+    """
+    Returns the alert book, re-reading ALERTS_FILE if another process wrote
+    it, or only the journal lines it appended. Callers must hold _write_lock.
+    """
+    global _alert_book, _alert_book_sig
+    signature = (_log_signature(ALERTS_FILE), _log_signature(ALERTS_JOURNAL_FILE))
+    if _alert_book is not None and signature == _alert_book_sig:
+        return _alert_book
+    # A journal without its ALERTS_FILE (deleted by hand) only holds part of the counters
+    journal_size = signature[1][0] if signature[0] and signature[1] else 0
+    if _alert_book is None or signature[0] != _alert_book_sig[0] or journal_size < _alert_journal['pos']:
+        book = None
+        if signature[0] is not None:
+            try:
+                with open(ALERTS_FILE, 'r') as f:
+                    book = AlertBook.from_json(json.load(f), _tuplify)
+            except (OSError, ValueError, KeyError, TypeError):
+                book = None # Unreadable: start over, every batch gets recounted
+        _alert_book = book or AlertBook()
+        _alert_journal.update(pos=0, lines=0)
+    del _alert_changes[:]
+    _alert_book_sig = signature
+    if journal_size > _alert_journal['pos'] and not _replay_alert_journal(_alert_book):
+        # Cut short by a crash. The book misses that save, whose batches
+        # then no longer match their versions and get recounted.
+        _write_alert_book()
+    return _alert_book
+
+def _replay_alert_journal(book):
+    """Applies the journal lines after _alert_journal['pos'] to book; False if one is damaged."""
+    with open(ALERTS_JOURNAL_FILE, 'rb') as f:
+        f.seek(_alert_journal['pos'])
+        data = f.read()
+    for line in data.splitlines(keepends=True):
+        try:
+            if not line.endswith(b'\n'):
+                raise ValueError("unterminated line")
+            changes = json.loads(line)
+        except ValueError:
+            return False
+        for change in changes:
+            if 'restamp' in change:
+                _restamp_alert_versions(book, *change['restamp'])
+            else:
+                book.load_counts(change['batch'], [(roll_no, name, present, total)
+                                                   for roll_no, name, present, total in change['counts']])
+                book.versions[change['batch']] = _tuplify(change['version'])
+        _alert_journal['pos'] += len(line)
+        _alert_journal['lines'] += 1
+    return True
+
+def _write_alert_book(force=False):
+    """
+    Persists the whole alert book and starts a new journal, unless alerts
+    have never been used here. Callers must hold _write_lock.
+    """
+    global _alert_book_sig
+    del _alert_changes[:]
+    if _alert_book is None or (not force and not _alert_book.versions and not os.path.exists(ALERTS_FILE)):
+        return
+    if os.path.exists(ALERTS_JOURNAL_FILE):
+        os.remove(ALERTS_JOURNAL_FILE)
+    tmp_file = ALERTS_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        f.write(json.dumps(_alert_book.to_json()))
+    os.replace(tmp_file, ALERTS_FILE)
+    _alert_journal.update(pos=0, lines=0)
+    _alert_book_sig = (_log_signature(ALERTS_FILE), None)
+
+def _append_alert_journal():
+    """
+    Persists the changes a save made to the alert book as one journal line,
+    so a save writes its own students' counters rather than every batch's.
+    Callers must hold _write_lock.
+    """
+    global _alert_book_sig
+    if not _alert_changes:
+        return
+    if _alert_journal['lines'] >= ALERTS_JOURNAL_LIMIT or not os.path.exists(ALERTS_FILE):
+        _write_alert_book()
+        return
+    line = (json.dumps(_alert_changes) + '\n').encode('utf-8')
+    with open(ALERTS_JOURNAL_FILE, 'ab') as f:
+        f.write(line)
+    del _alert_changes[:]
+    _alert_journal['pos'] += len(line)
+    _alert_journal['lines'] += 1
+    _alert_book_sig = (_log_signature(ALERTS_FILE), _log_signature(ALERTS_JOURNAL_FILE))
+
+def _tracked_alert_batches(batches):
+    """The batches whose alert counters are up to date. Callers must hold _write_lock."""
+    book = _get_alert_book()
+    return {batch_name for batch_name in batches
+            if book.versions.get(batch_name) is not None and book.versions[batch_name] == _batch_signature(batch_name)}
+
+def _update_alerts(tracked, batches, saved_sessions, old_rows):
+    """
+    Applies saved (date, batch, rows) sessions to the alert counters of the
+    tracked batches, taking back the rows in old_rows; the other saved
+    batches are marked for a recount. Callers must hold _write_lock.
+    """
+    book = _get_alert_book()
+    touched = {}  # {batch: keys of the students whose counters changed}
+    for attendance_date, batch_name, new_df in saved_sessions:
+        if batch_name in tracked:
+            live_df = new_df[new_df['status'] != TOMBSTONE_STATUS]
+            touched.setdefault(batch_name, set()).update(
+                book.apply_session(batch_name, live_df, old_rows.get((attendance_date, batch_name))))
+    for batch_name in batches:
+        if batch_name in tracked:
+            book.versions[batch_name] = _batch_signature(batch_name)
+        elif batch_name in book.versions:
+            book.versions[batch_name] = None
+        else:
+            continue
+        _alert_changes.append({'batch': batch_name, 'version': book.versions[batch_name],
+                               'counts': book.counts_json(batch_name, touched.get(batch_name, ()))})
+    _append_alert_journal()
+
+def _recount_alerts(stale):
+    """
+    Recounts the {batch: signature} stale batches from the logs, in one
+    pass per log. The passes run without the lock, so saves can go on; a
+    batch written to in the meantime is tried again, and the last of
+    ALERT_RECOUNT_TRIES passes reads with the lock held. Returns the set of
+    recounted batches. Callers must not hold _write_lock.
+    """
+    recounted = set()
+    pending = dict(stale)
+    for attempt in range(ALERT_RECOUNT_TRIES):
+        if not pending:
+            break
+        locked = attempt == ALERT_RECOUNT_TRIES - 1
+        if locked:
+            _write_lock.acquire()
+        try:
+            try:
+                built = _build_batch_summaries(pending)
+            except Exception:
+                if locked:
+                    raise
+                built = {} # Most likely a log read half-way through another process' write
+            with (contextlib.nullcontext() if locked else _write_lock):
+                book = _get_alert_book()
+                for batch, summary in built.items():
+                    if _batch_signature(batch) == pending[batch]:
+                        book.set_counts(batch, summary.status_counts(), pending[batch])
+                        _report_summaries.setdefault(batch, (pending[batch], summary))
+                        recounted.add(batch)
+                pending = {batch: _batch_signature(batch) for batch in pending if batch not in recounted}
+                if recounted:
+                    _write_alert_book()
+        finally:
+            if locked:
+                _write_lock.release()
+    return recounted
+
+def get_alerts(batch_name=None):
+    """
+    Returns (alerts, message): the students of one batch (or of every batch)
+    that break the alert rules, as dicts with batch, roll_no, student_name,
+    present, total and percent, lowest percent first. Usually a plain read;
+    batches whose data changed outside this module are recounted first,
+    from their report summary if one is cached, else by _recount_alerts.
+    """
+    try:
+        roster = _roster().batches()
+        batches = list(roster) if batch_name is None else [batch_name]
+        with _write_lock:
+            book = _get_alert_book()
+            stale = {batch: _batch_signature(batch) for batch in batches}
+            stale = {batch: signature for batch, signature in stale.items() if book.versions.get(batch) != signature}
+            from_logs = {batch: signature for batch, signature in stale.items()
+                         if batch not in _valid_summaries([batch])}
+        recounted = _recount_alerts(from_logs) if from_logs else set()
+
+        with _write_lock:
+            book = _get_alert_book()
+            changed = bool(recounted)
+            for gone in set(book.versions) - set(roster):
+                book.forget_batch(gone)
+                changed = True
+            for batch, summary in _valid_summaries(set(stale) - set(from_logs)).items():
+                book.set_counts(batch, summary.status_counts(), _batch_signature(batch))
+                recounted.add(batch)
+            roster_changed = book.roster_version != _roster_signature()
+            for batch in batches:
+                if batch in recounted or roster_changed:
+                    book.set_roster(batch, [(str(s['roll']), s['name']) for s in roster.get(batch, [])])
+                    changed = True
+            if roster_changed and batch_name is None:
+                book.roster_version = _roster_signature()
+            if changed:
+                _write_alert_book()
+            alerts = book.alerts(batch_name)
+            threshold = book.rules['threshold']
+        return alerts, f"{len(alerts)} students below {threshold:g}% attendance."
+    except Exception as e:
+        return None, f"Error loading alerts: {e}"
+
+def get_alert_rules():
+    """Returns the alert rules: {'threshold': percent, 'min_sessions': count}."""
+    with _write_lock:
+        return dict(_get_alert_book().rules)
+
+def set_alert_rules(threshold=None, min_sessions=None):
+    """Changes the alert rules and re-checks every student against them (no data is read)."""
+    rules = {}
+    if threshold is not None:
+        rules['threshold'] = float(threshold)
+    if min_sessions is not None:
+        rules['min_sessions'] = int(min_sessions)
+    try:
+        with _write_lock:
+            book = _get_alert_book()
+            book.set_rules(**rules)
+            _write_alert_book(force=True)
+            rules = dict(book.rules)
+        return True, f"Alerting below {rules['threshold']:g}% after {rules['min_sessions']} sessions."
+    except Exception as e:
+        return False, f"Error saving alert rules: {e}"
@@ -0,0 +1,92 @@
+"""
+Inter-process lock for the attendance data files.
+
+Several copies of the app (or the app and a cli.py job) may work on the same
+data folder, e.g. on a shared drive. data_manager does every read-modify-write
+of the logs, indexes and storage config while holding a DataLock, which is a
+thread lock plus an advisory OS lock on a lock file next to the data (flock on
+Unix, msvcrt.locking on Windows). Together with temp-file + os.replace for
+rewrites this keeps concurrent savers from losing each other's rows.
+
+Network file systems differ in how well they honour advisory locks; SMB and
+NFSv4 generally do.
+"""
+import os
+import random
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _try_lock(fd):
+    """Takes the OS lock on fd without blocking; returns False if it is held elsewhere."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class DataLock:
+    """
+    Exclusive lock held by one thread of one process at a time. Use it as a
+    context manager. Waiting processes retry with exponential backoff plus
+    jitter (so they do not retry in lockstep) and give up with TimeoutError
+    after `timeout` seconds. Not re-entrant.
+    """
+    def __init__(self, lock_file, timeout=10.0, initial_delay=0.002, max_delay=0.1):
+        self.lock_file = lock_file
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Timed out waiting for the attendance data lock ({self.timeout:g}s).")
+        try:
+            fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o666)
+            delay = self.initial_delay
+            while not _try_lock(fd):
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"Another program has held {self.lock_file} for more than {self.timeout:g}s.")
+                time.sleep(random.uniform(delay / 2, delay))
+                delay = min(delay * 2, self.max_delay)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._fd = fd
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
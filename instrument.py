@@ -0,0 +1,240 @@
+"""
+Timing spans around the slow paths: saving, reports, charts and opening a batch.
+
+Code marks its stages like this:
+
+    with instrument.span('report.to_report', rows=len(roster_df)) as sp:
+        ...
+        sp.set(dates=summary.session_count)
+
+Spans nest per thread. A span opened while another one is open on the same
+thread becomes its child, so every top-level call ends up as a tree of
+stages with their times. Instrumentation is off by default. span() then
+returns one shared object that does nothing, so a marked stage costs a
+function call and a flag check. Keyword arguments are still evaluated at
+the call site, so pass only cheap values there and use set() for anything
+that takes work to compute.
+
+After enable(), every finished top-level span (children included) goes to:
+- recent(), which keeps the last RECENT_SPANS trees for the app's debug
+  overlay (F12);
+- the 'attendance.perf' logger, one JSON object per span, if log is set;
+- a cProfile .prof file in profile_dir, if given (read it with
+  python -m pstats).
+With memory=True, tracemalloc runs and each span records mem_kb, the change
+in traced Python memory. Tracing slows everything down, so keep it for
+looking at memory.
+"""
+import cProfile
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+RECENT_SPANS = 50 # Top-level span trees kept for recent()
+
+logger = logging.getLogger('attendance.perf')
+
+_enabled = False
+_log = False
+_memory = False
+_profile_dir = None
+_started_tracemalloc = False
+_local = threading.local()      # .current = innermost open span of the thread
+_recent = deque(maxlen=RECENT_SPANS)
+_recent_lock = threading.Lock()
+_generation = 0                 # Goes up with every finished top-level span
+_ids = itertools.count(1)
+
+
+class Span:
+    """One timed stage. ms and mem_kb are set when it ends."""
+    __slots__ = ('name', 'fields', 'children', 'parent', 'thread', 'ms', 'mem_kb',
+                 '_start', '_mem', '_profile')
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.children = []
+        self.parent = None
+        self.thread = None
+        self.ms = None
+        self.mem_kb = None
+        self._mem = None
+        self._profile = None
+
+    def set(self, **fields):
+        """Adds fields (row counts, cache hits, ...) to the span."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.parent = getattr(_local, 'current', None)
+        _local.current = self
+        self.thread = threading.current_thread().name
+        if self.parent is None and _profile_dir is not None:
+            self._profile = _start_profile()
+        if _memory and tracemalloc.is_tracing():
+            self._mem = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.ms = (time.perf_counter() - self._start) * 1000
+        if self._mem is not None and tracemalloc.is_tracing():
+            self.mem_kb = (tracemalloc.get_traced_memory()[0] - self._mem) / 1024
+        if exc_type is not None:
+            self.fields['error'] = exc_type.__name__
+        _local.current = self.parent
+        if self.parent is not None:
+            self.parent.children.append(self)
+        else:
+            _finish(self)
+        return False
+
+    def to_dict(self):
+        data = {'span': self.name, 'ms': round(self.ms, 3), 'thread': self.thread}
+        if self.mem_kb is not None:
+            data['mem_kb'] = round(self.mem_kb, 1)
+        data.update(self.fields)
+        return data
+
+
+class _NoSpan:
+    """What span() returns while instrumentation is off."""
+    __slots__ = ()
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, **fields):
+    """Context manager timing one stage; see the module docstring."""
+    if not _enabled:
+        return _NO_SPAN
+    return Span(name, fields)
+
+def is_enabled():
+    return _enabled
+
+def enable(log=None, memory=None, profile_dir=None):
+    """
+    Starts recording spans. Each argument left at None keeps its current
+    setting (all off at first). log is True (JSON lines on stderr), a file
+    name, or False to stop logging. memory turns tracemalloc on or off (one
+    started elsewhere is left running). profile_dir is a folder that gets
+    one .prof file per top-level span, or False to stop profiling.
+    """
+    global _enabled, _log, _memory, _profile_dir
+    if log is not None:
+        _close_log()
+        if log:
+            handler = logging.StreamHandler() if log is True else logging.FileHandler(log, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        _log = bool(log)
+    if memory is not None:
+        _set_memory(memory)
+    if profile_dir is not None:
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        _profile_dir = profile_dir or None
+    _enabled = True
+
+def disable():
+    """Stops recording and turns every option off. Spans still open finish normally; recent() is kept."""
+    global _enabled, _log, _profile_dir
+    _enabled = False
+    _set_memory(False)
+    _profile_dir = None
+    _close_log()
+    _log = False
+
+def recent():
+    """(generation, [top-level spans, oldest first]); generation changes when a span is added."""
+    with _recent_lock:
+        return _generation, list(_recent)
+
+def clear():
+    global _generation
+    with _recent_lock:
+        _recent.clear()
+        _generation += 1
+
+def format_span(root):
+    """Lines of text showing a span tree, one indented line per span."""
+    lines = []
+    def walk(s, depth):
+        extra = ''.join(f"  {key}={value}" for key, value in s.fields.items())
+        if s.mem_kb is not None:
+            extra += f"  mem={s.mem_kb:+.0f} KB"
+        lines.append(f"{'  ' * depth}{s.name:<{max(1, 32 - 2 * depth)}} {s.ms:9.1f} ms{extra}")
+        for child in s.children:
+            walk(child, depth + 1)
+    walk(root, 0)
+    return lines
+
+
+def _set_memory(on):
+    global _memory, _started_tracemalloc
+    if on and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    elif not on and _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    _memory = on
+
+def _close_log():
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+def _start_profile():
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError: # Another profiler is active, e.g. a span on another thread (Python 3.12+)
+        return None
+    return profile
+
+def _finish(root):
+    global _generation
+    span_id = next(_ids)
+    profile = root._profile
+    if profile is not None:
+        profile.disable()
+        root._profile = None
+    if profile is not None and _profile_dir is not None: # Not if disabled in the meantime
+        name = re.sub(r'[^\w.-]', '_', root.name)
+        path = os.path.join(_profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{span_id:05d}-{name}.prof")
+        try:
+            profile.dump_stats(path)
+            root.fields['profile'] = os.path.basename(path)
+        except OSError:
+            pass
+    with _recent_lock:
+        _recent.append(root)
+        _generation += 1
+    if _log and logger.isEnabledFor(logging.INFO):
+        def walk(s, depth, parent):
+            record = s.to_dict()
+            record.update(id=span_id, depth=depth, parent=parent)
+            logger.info(json.dumps(record, default=str))
+            for child in s.children:
+                walk(child, depth + 1, s.name)
+        walk(root, 0, None)
@@ -0,0 +1,51 @@
+"""
+Deferred imports for the scientific stack.
+
+pandas, numpy and matplotlib take most of the app's start-up time, but the
+welcome and batch screens never need them. Modules bind them with
+lazy_module(), which returns a stand-in that imports the real module on
+first attribute access (e.g. the first pd.DataFrame(...) call). prewarm()
+can import them in a background thread once the first frame is on screen,
+so the first report does not pay for the import either.
+"""
+import importlib
+import threading
+
+# Imported by prewarm(), in this order
+HEAVY_MODULES = ['numpy', 'pandas', 'matplotlib.figure', 'matplotlib.backends.backend_agg']
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only called for names not set in __init__, i.e. the module's attributes
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+def prewarm(modules=None):
+    """Imports the heavy modules now; errors are left for the real import to report."""
+    for name in modules or HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+def prewarm_async(modules=None):
+    """Runs prewarm() in a daemon thread and returns the thread."""
+    thread = threading.Thread(target=prewarm, args=(modules,), name="import-prewarm", daemon=True)
+    thread.start()
+    return thread
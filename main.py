@@ -1,13 +1,38 @@
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, font
+from tkinter import ttk, font, messagebox
 import ui_frames
 import data_manager
+import instrument
+import lazy_import
+
+# pandas/numpy/matplotlib are imported on first use (see lazy_import.py).
+# When True they are imported in the background once the first frame is up,
+# so the first report or chart does not have to wait for them either.
+PREWARM_IMPORTS = True
+PREWARM_DELAY_MS = 300
+# Timing spans of the slow paths (see instrument.py). F12 opens an overlay
+# that shows them; these also record them from the start, as JSON lines
+# (True = stderr, or a file name) and/or a cProfile dump per operation.
+INSTRUMENT_LOG = None
+INSTRUMENT_PROFILE_DIR = None
+# How often errors reported from background threads are checked for
+ERROR_POLL_MS = 200
 
 class AttendanceApp(tk.Tk):
     """Main application controller."""
     def __init__(self, *args, **kwargs):
         tk.Tk.__init__(self, *args, **kwargs)
 
+        # Reports and charts load on TaskRunner threads, and data_manager may
+        # report an error from there (e.g. a malformed students.json)
+        self._errors = queue.SimpleQueue()
+        data_manager.set_error_handler(self.show_error)
+        self.after(ERROR_POLL_MS, self._show_queued_errors)
+
+        if INSTRUMENT_LOG or INSTRUMENT_PROFILE_DIR:
+            instrument.enable(log=INSTRUMENT_LOG, profile_dir=INSTRUMENT_PROFILE_DIR)
         data_manager.setup_files()
         
         self.title("Attendance Management System")
@@ -49,6 +74,36 @@ class AttendanceApp(tk.Tk):
         # Start by showing the Welcome frame
         self.show_frame("WelcomeFrame")
 
+        if PREWARM_IMPORTS:
+            self.after(PREWARM_DELAY_MS, lazy_import.prewarm_async)
+
+        self.debug_overlay = None
+        self.bind("<F12>", self.toggle_debug_overlay)
+
+    def toggle_debug_overlay(self, event=None):
+        """Opens or closes the timings window (ui_frames.DebugOverlay)."""
+        if self.debug_overlay is not None and self.debug_overlay.winfo_exists():
+            self.debug_overlay.close()
+            self.debug_overlay = None
+        else:
+            self.debug_overlay = ui_frames.DebugOverlay(self)
+
+    def show_error(self, title, message):
+        """data_manager's error handler: shows the error on the Tk thread, whichever thread reported it."""
+        if threading.current_thread() is threading.main_thread():
+            messagebox.showerror(title, message)
+        else:
+            self._errors.put((title, message))
+
+    def _show_queued_errors(self):
+        while True:
+            try:
+                title, message = self._errors.get_nowait()
+            except queue.Empty:
+                break
+            messagebox.showerror(title, message)
+        self.after(ERROR_POLL_MS, self._show_queued_errors)
+
     def show_frame(self, frame_name):
         """Raises the selected frame to the top."""
         frame = self.frames[frame_name]
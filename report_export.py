@@ -0,0 +1,186 @@
+"""
+Streaming export of detailed reports to CSV or Excel (.xlsx).
+
+Reports are written a chunk of students at a time, straight from the batch
+summaries (data_manager.get_report_chunks), so an export never needs the
+report grid on screen and only one chunk of report rows is in memory at a
+time. Output goes to temp files that replace the targets only once the
+whole export succeeded; a cancelled or failed export leaves no files behind.
+
+XLSX output requires openpyxl (pip install openpyxl). Its write-only mode
+streams rows to disk as well.
+"""
+import os
+import re
+from urllib.parse import quote
+
+import data_manager
+import instrument
+
+FORMATS = ('csv', 'xlsx')
+# Students per chunk; each chunk is one to_report() call and one write
+EXPORT_CHUNK_ROWS = 500
+XLSX_SHEET_NAME_MAX = 31
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def report_file_name(batch_name, fmt='csv'):
+    """File name of a batch's report, safe on every OS (also used by cli.py)."""
+    return quote(batch_name, safe=' ()') + '.' + fmt
+
+def _sheet_title(batch_name, used):
+    """Excel sheet names: at most 31 characters, no []:*?/\\ and unique within the workbook."""
+    title = re.sub(r'[\[\]:*?/\\]', '_', batch_name)[:XLSX_SHEET_NAME_MAX] or 'Sheet'
+    base, n = title, 2
+    while title.lower() in used:
+        suffix = f" ({n})"
+        title = base[:XLSX_SHEET_NAME_MAX - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+class _CsvWriter:
+    """One CSV file per batch; target is the file (one batch) or a directory."""
+    def __init__(self, target, several):
+        self.target = target
+        self.several = several or os.path.isdir(target)
+        self.done = []  # [(temp file, final file)]
+        self._file = None
+        if self.several:
+            os.makedirs(target, exist_ok=True)
+
+    def begin(self, batch_name, columns):
+        path = os.path.join(self.target, report_file_name(batch_name)) if self.several else self.target
+        self.done.append((path + '.tmp', path))
+        self._file = open(path + '.tmp', 'w', newline='', encoding='utf-8')
+        self._header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+
+    def end(self):
+        self._file.close()
+        self._file = None
+
+    def commit(self):
+        for tmp_file, path in self.done:
+            os.replace(tmp_file, path)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+        for tmp_file, _ in self.done:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+
+class _XlsxWriter:
+    """One workbook with a sheet per batch."""
+    def __init__(self, target, several):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ImportError("Excel export requires openpyxl (pip install openpyxl).")
+        self.target = target
+        self._book = Workbook(write_only=True)
+        self._titles = set()
+        self._sheet = None
+
+    def begin(self, batch_name, columns):
+        self._sheet = self._book.create_sheet(_sheet_title(batch_name, self._titles))
+        self._sheet.append(list(columns))
+
+    def write(self, chunk):
+        # Unmarked cells are NaN in the report; Excel gets empty cells instead
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            self._sheet.append(row)
+
+    def end(self):
+        self._sheet = None
+
+    def commit(self):
+        if not self._titles:
+            self._book.create_sheet('Report') # A workbook needs at least one sheet
+        self._book.save(self.target + '.tmp')
+        os.replace(self.target + '.tmp', self.target)
+
+    def abort(self):
+        # Saving is how openpyxl finishes its sheets and drops their temp files
+        try:
+            if not os.path.exists(self.target + '.tmp'):
+                self._book.save(self.target + '.tmp')
+        except Exception:
+            pass
+        if os.path.exists(self.target + '.tmp'):
+            os.remove(self.target + '.tmp')
+
+
+def export_reports(batch_names, target, fmt='csv', progress=None, cancelled=None):
+    """
+    Writes the detailed reports of batch_names. With fmt 'xlsx' target is a
+    workbook with one sheet per batch; with 'csv' it is the file for a single
+    batch, or a directory (always, if it exists) that gets one
+    report_file_name() per batch.
+    progress(done, total) is called after every chunk with the number of
+    students written so far; cancelled() is polled between chunks and stops
+    the export. Batches without a report are skipped and named in the
+    message. Returns (success, message).
+    """
+    if fmt not in FORMATS:
+        return False, f"Unknown export format '{fmt}'."
+    batch_names = list(batch_names)
+    with instrument.span('export_reports', fmt=fmt, batches=len(batch_names)):
+        return _export_reports(batch_names, target, fmt, progress, cancelled)
+
+def _export_reports(batch_names, target, fmt, progress, cancelled):
+    writer = None
+    try:
+        writer = (_XlsxWriter if fmt == 'xlsx' else _CsvWriter)(target, several=len(batch_names) > 1)
+        # Batches are snapshotted one at a time, so only one summary copy exists at once
+        rosters = {batch_name: len(data_manager.get_students(batch_name)) for batch_name in batch_names}
+        total = sum(rosters.values())
+        done, exported, skipped = 0, 0, []
+        for batch_name in batch_names:
+            chunks, rows, message = data_manager.get_report_chunks(batch_name, EXPORT_CHUNK_ROWS)
+            if chunks is None:
+                skipped.append(f"{batch_name} ({message})")
+                total -= rosters[batch_name]
+                continue
+            total += rows - rosters[batch_name] # In case the roster changed in between
+            exported += 1
+            started = False
+            with instrument.span('export.batch', rows=rows):
+                for chunk in chunks:
+                    if cancelled is not None and cancelled():
+                        raise ExportCancelled()
+                    if not started:
+                        writer.begin(batch_name, chunk.columns)
+                        started = True
+                    writer.write(chunk)
+                    done += len(chunk)
+                    if progress is not None:
+                        progress(done, total)
+                if started:
+                    writer.end()
+        if not exported:
+            writer.abort()
+            return False, "Nothing to export: " + "; ".join(skipped)
+        writer.commit()
+    except ExportCancelled:
+        writer.abort()
+        return False, "Export cancelled."
+    except Exception as e:
+        if writer is not None:
+            writer.abort()
+        return False, f"Could not export: {e}"
+
+    message = f"Exported {done} students of {exported} batch(es) to {target}."
+    if skipped:
+        message += " Skipped: " + "; ".join(skipped)
+    return True, message
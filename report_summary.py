@@ -0,0 +1,195 @@
+"""
+Materialized per-batch attendance summary behind data_manager.get_report_data.
+
+A BatchSummary holds the attendance of one batch as a students x sessions
+matrix of int8 status codes (0 = unmarked, 1 = Present, 2 = Absent; any
+other status string read from the log gets the next free code). data_manager
+keeps one per batch in memory and patches it whenever a session of that
+batch is saved. The Present/Absent/Total/Percent columns are vectorized sums
+over the matrix, and status strings only appear when to_report() builds the
+DataFrame for display or export.
+"""
+from lazy_import import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+UNMARKED, PRESENT, ABSENT = 0, 1, 2
+
+
+class BatchSummary:
+    """
+    Status matrix of one batch. Rows are students keyed by
+    (roll_no, student_name), the same key the report uses to match
+    attendance rows against the roster; columns are session dates.
+    """
+    def __init__(self):
+        self.labels = [np.nan, 'Present', 'Absent'] # code -> status shown in the report
+        self._codes = {'Present': PRESENT, 'Absent': ABSENT}
+        self._rows = {}   # {(roll_no, student_name): row}
+        self._cols = {}   # {date: column}
+        self._matrix = np.zeros((0, 0), dtype=np.int8)
+
+    @property
+    def session_count(self):
+        return len(self._cols)
+
+    def dates(self):
+        """Sorted list of the session dates in this batch."""
+        return sorted(self._cols)
+
+    def _code(self, status):
+        code = self._codes.get(status)
+        if code is None:
+            if len(self.labels) > np.iinfo(np.int8).max:
+                raise ValueError("Too many distinct attendance statuses in one batch.")
+            code = self._codes[status] = len(self.labels)
+            self.labels.append(status)
+        return code
+
+    def _reserve(self, n_rows, n_cols):
+        """Grows the matrix (doubling) so it has at least n_rows x n_cols cells."""
+        rows, cols = self._matrix.shape
+        if n_rows <= rows and n_cols <= cols:
+            return
+        grown = np.zeros((max(n_rows, rows * 2, 8), max(n_cols, cols * 2, 8)), dtype=np.int8)
+        grown[:rows, :cols] = self._matrix
+        self._matrix = grown
+
+    @classmethod
+    def from_rows(cls, df):
+        """Builds a summary from live attendance rows of a single batch."""
+        summary = cls()
+        summary.merge_rows(df)
+        return summary
+
+    def copy(self):
+        """Independent snapshot, e.g. to build a report from while saves go on."""
+        summary = BatchSummary()
+        summary.labels = list(self.labels)
+        summary._codes = dict(self._codes)
+        summary._rows = dict(self._rows)
+        summary._cols = dict(self._cols)
+        summary._matrix = self._matrix[:len(self._rows), :len(self._cols)].copy()
+        return summary
+
+    def merge_rows(self, df):
+        """
+        Adds live attendance rows of this batch that come after everything
+        merged so far. Like the old pivot_table(aggfunc='first'), the first
+        status seen per student and date wins. Used to build a summary from a
+        log read in chunks: memory stays proportional to the batch, not the log.
+        """
+        df = df.assign(roll_no=df['roll_no'].astype(str)) \
+               .drop_duplicates(subset=['roll_no', 'student_name', 'date'], keep='first')
+        if df.empty:
+            return
+
+        student_ids, students = pd.factorize(pd.MultiIndex.from_arrays([df['roll_no'], df['student_name']]))
+        date_ids, dates = pd.factorize(df['date'])
+        status_ids, statuses = pd.factorize(df['status'])
+        codes = np.array([self._code(status) for status in statuses], dtype=np.int8)
+
+        new_students = [key for key in students if key not in self._rows]
+        new_dates = [date_ for date_ in dates if date_ not in self._cols]
+        self._reserve(len(self._rows) + len(new_students), len(self._cols) + len(new_dates))
+        for key in new_students:
+            self._rows[key] = len(self._rows)
+        for date_ in new_dates:
+            self._cols[date_] = len(self._cols)
+
+        row_ids = np.fromiter((self._rows[key] for key in students), dtype=np.intp, count=len(students))[student_ids]
+        col_ids = np.fromiter((self._cols[d] for d in dates), dtype=np.intp, count=len(dates))[date_ids]
+        unmarked = self._matrix[row_ids, col_ids] == UNMARKED
+        self._matrix[row_ids[unmarked], col_ids[unmarked]] = codes[status_ids[unmarked]]
+
+    def remove_session(self, date_):
+        """Forgets a session, e.g. when a tombstone in the log supersedes it."""
+        col = self._cols.get(date_)
+        if col is not None:
+            self._remove_column(col)
+            del self._cols[date_]
+
+    def apply_session(self, date_, rows):
+        """
+        Replaces one session with rows of (roll_no, student_name, status).
+        An empty session removes it. Cost is proportional to the session size.
+        """
+        marks = {}
+        for roll_no, student_name, status in rows:
+            marks.setdefault((str(roll_no), student_name), status)
+
+        col = self._cols.get(date_)
+        if not marks:
+            self.remove_session(date_)
+            return
+
+        new_students = [key for key in marks if key not in self._rows]
+        if col is None:
+            col = len(self._cols)
+        self._reserve(len(self._rows) + len(new_students), col + 1)
+        for key in new_students:
+            self._rows[key] = len(self._rows)
+        self._cols[date_] = col
+
+        self._matrix[:, col] = UNMARKED
+        row_ids = np.fromiter((self._rows[key] for key in marks), dtype=np.intp, count=len(marks))
+        self._matrix[row_ids, col] = [self._code(status) for status in marks.values()]
+
+    def session_rows(self, date_):
+        """Returns one session as a DataFrame of roll_no, student_name and status."""
+        col = self._cols.get(date_)
+        keys = list(self._rows)
+        codes = self._matrix[:len(keys), col] if col is not None else np.zeros(0, dtype=np.int8)
+        marked = np.flatnonzero(codes != UNMARKED)
+        labels = np.array(self.labels, dtype=object)
+        return pd.DataFrame({
+            'roll_no': [keys[i][0] for i in marked],
+            'student_name': [keys[i][1] for i in marked],
+            'status': labels[codes[marked]],
+        }, columns=['roll_no', 'student_name', 'status'])
+
+    def status_counts(self):
+        """{(roll_no, student_name): (present, total)} of every student with a Present or Absent mark."""
+        matrix = self._matrix[:len(self._rows), :len(self._cols)]
+        present = (matrix == PRESENT).sum(axis=1)
+        total = present + (matrix == ABSENT).sum(axis=1)
+        return {key: (int(present[row]), int(total[row]))
+                for key, row in self._rows.items() if total[row]}
+
+    def _remove_column(self, col):
+        last = len(self._cols) - 1
+        if col != last:
+            # Move the last session into the freed column
+            self._matrix[:, col] = self._matrix[:, last]
+            moved = next(d for d, c in self._cols.items() if c == last)
+            self._cols[moved] = col
+        self._matrix[:, last] = UNMARKED
+
+    def to_report(self, roster_df):
+        """
+        Returns roster_df (with 'roll_no' and 'student_name' columns) extended
+        with one column per session date and the Present/Absent/Total/Percent
+        summary columns.
+        """
+        keys = zip(roster_df['roll_no'], roster_df['student_name'])
+        row_ids = np.fromiter((self._rows.get(key, -1) for key in keys), dtype=np.intp, count=len(roster_df))
+        dates = self.dates()
+        col_ids = np.array([self._cols[d] for d in dates], dtype=np.intp)
+
+        # Students without any record get an all-unmarked row
+        codes = np.zeros((len(row_ids), len(col_ids)), dtype=np.int8)
+        known = row_ids >= 0
+        codes[known] = self._matrix[np.ix_(row_ids[known], col_ids)]
+
+        report_df = roster_df.copy()
+        labels = np.array(self.labels, dtype=object)
+        date_df = pd.DataFrame(labels[codes], columns=dates, index=report_df.index, dtype=object)
+        report_df = pd.concat([report_df, date_df], axis=1)
+
+        report_df['Present'] = (codes == PRESENT).sum(axis=1)
+        report_df['Absent'] = (codes == ABSENT).sum(axis=1)
+        report_df['Total'] = report_df['Present'] + report_df['Absent']
+        # Use a safe division to prevent errors when Total is 0
+        report_df['Percent'] = (report_df['Present'].div(report_df['Total']).fillna(0) * 100).round(1)
+        return report_df
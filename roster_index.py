@@ -0,0 +1,91 @@
+"""
+Search index over the roster of one batch, behind data_manager.get_roster_index.
+
+A RosterIndex maps roll numbers and normalized name tokens (lower case,
+accents stripped, split on anything that is not a letter or digit) to the
+students' positions in the roster list. Tokens are kept sorted, so a prefix
+lookup is a bisect plus a walk over the matching tokens. A query matches the
+students for which every query word is a prefix of their roll number or of
+one of their name tokens; a word that matches nothing is retried as a typo
+against the name tokens. Results are positions in roster order, so the
+attendance list can show them without rebuilding its rows.
+"""
+import bisect
+import difflib
+import re
+import unicodedata
+
+# A word that matches no prefix is compared against the name tokens when it is at least this long
+FUZZY_MIN_LENGTH = 3
+FUZZY_CUTOFF = 0.75
+FUZZY_MAX_TOKENS = 5
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Lower case, accents stripped: 'José' and 'jose' are the same token."""
+    text = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+def tokens(text):
+    return _WORD.findall(normalize(text))
+
+
+class RosterIndex:
+    """Index over a list of student dicts ({roll, name}) in roster order."""
+    def __init__(self, students):
+        self.students = list(students)
+        self._by_roll = {}  # {normalized roll: [positions]}, exact match
+        postings = {}       # {token: [positions]}, names and rolls
+        name_tokens = set()
+        for pos, student in enumerate(self.students):
+            roll = normalize(student['roll']).strip()
+            self._by_roll.setdefault(roll, []).append(pos)
+            words = set(tokens(student['name']))
+            name_tokens.update(words)
+            words.add(roll)
+            words.update(tokens(roll)) # 'CS-12' is found by '12' as well as by 'cs'
+            for word in words:
+                postings.setdefault(word, []).append(pos)
+        self._tokens = sorted(postings)
+        self._postings = postings
+        self._name_tokens = sorted(name_tokens)
+
+    def __len__(self):
+        return len(self.students)
+
+    def find_roll(self, roll_no):
+        """Positions of the students with exactly this roll number (usually one)."""
+        return list(self._by_roll.get(normalize(roll_no).strip(), []))
+
+    def _prefix(self, word):
+        found = set()
+        i = bisect.bisect_left(self._tokens, word)
+        while i < len(self._tokens) and self._tokens[i].startswith(word):
+            found.update(self._postings[self._tokens[i]])
+            i += 1
+        return found
+
+    def _fuzzy(self, word):
+        found = set()
+        if len(word) >= FUZZY_MIN_LENGTH:
+            for token in difflib.get_close_matches(word, self._name_tokens, FUZZY_MAX_TOKENS, FUZZY_CUTOFF):
+                found.update(self._postings[token])
+        return found
+
+    def search(self, query):
+        """
+        Positions (in roster order) of the students matching every word of
+        query. An empty query matches everyone.
+        """
+        words = tokens(query)
+        if not words:
+            return list(range(len(self.students)))
+        matches = None
+        for word in words:
+            found = self._prefix(word) or self._fuzzy(word)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+        return sorted(matches)
@@ -0,0 +1,248 @@
+"""
+SQLite storage engine for data_manager (storage config "engine": "sqlite").
+
+Batches, students and attendance live in one database file instead of
+students.json plus attendance logs:
+
+    batches(name, revision)           revision goes up on every change
+    students(batch, roll_no, name)    roster, in students.json order
+    attendance(batch, date, roll_no, student_name, status)
+
+attendance is indexed on (batch, date), on date and on roll_no, so session
+lookups, per-batch reports and date-range queries are index range scans
+rather than full log reads.
+An overwrite deletes and re-inserts a session inside one transaction, so no
+tombstones or compaction are needed. The database runs in WAL mode: readers
+are never blocked by a writer, and other processes writing at the same time
+wait on SQLite's own lock.
+"""
+import sqlite3
+import threading
+from lazy_import import lazy_module
+from storage_backends import ATTENDANCE_COLUMNS
+
+pd = lazy_module('pandas')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    roll_no TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS students_batch_roll ON students (batch, roll_no);
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    date TEXT NOT NULL,
+    roll_no TEXT NOT NULL,
+    student_name TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attendance_batch_date ON attendance (batch, date);
+CREATE INDEX IF NOT EXISTS attendance_roll_no ON attendance (roll_no);
+CREATE INDEX IF NOT EXISTS attendance_date ON attendance (date);
+"""
+
+
+class SqliteStore:
+    """
+    One database file. Every thread gets its own connection, since sqlite3
+    connections cannot be shared between threads. Roster methods mirror
+    data_manager.RosterCache (batches/students/student).
+    """
+    def __init__(self, path, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """Starts a write transaction; use the returned connection as a context manager."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return _Transaction(conn)
+
+    def close(self):
+        """Closes the calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Metadata ---
+
+    def get_meta(self, key):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def revision(self, batch_name):
+        """Counter that changes whenever the batch's roster or attendance changes."""
+        row = self._conn().execute("SELECT revision FROM batches WHERE name = ?", (batch_name,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _bump(conn, batch_name):
+        conn.execute("INSERT INTO batches (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (batch_name,))
+        conn.execute("UPDATE batches SET revision = revision + 1 WHERE name = ?", (batch_name,))
+        return conn.execute("SELECT revision FROM batches WHERE name = ?", (batch_name,)).fetchone()[0]
+
+    # --- Roster ---
+
+    def import_roster(self, batches, source=None):
+        """
+        Replaces the roster with a {batch: [{'roll', 'name'}, ...]} dict (the
+        students.json format). source is stored as meta 'roster_source' so the
+        caller can tell which version of the file was imported last.
+        """
+        with self._transaction() as conn:
+            old = {row[0] for row in conn.execute("SELECT name FROM batches")}
+            conn.execute("DELETE FROM students")
+            for batch, students in batches.items():
+                self._bump(conn, batch)
+                conn.executemany("INSERT INTO students (batch, roll_no, name) VALUES (?, ?, ?)",
+                                 [(batch, str(s['roll']), s['name']) for s in students])
+            for batch in old - set(batches):
+                self._bump(conn, batch)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('roster_source', ?)", (source,))
+
+    def batches(self):
+        roster = {}
+        rows = self._conn().execute(
+            "SELECT s.batch, s.roll_no, s.name FROM students s JOIN batches b ON b.name = s.batch "
+            "ORDER BY b.id, s.id")
+        for batch, roll_no, name in rows:
+            roster.setdefault(batch, []).append({'roll': roll_no, 'name': name})
+        return roster
+
+    def students(self, batch_name):
+        rows = self._conn().execute("SELECT roll_no, name FROM students WHERE batch = ? ORDER BY id",
+                                    (batch_name,))
+        return [{'roll': roll_no, 'name': name} for roll_no, name in rows]
+
+    def student(self, batch_name, roll_no):
+        row = self._conn().execute(
+            "SELECT roll_no, name FROM students WHERE batch = ? AND roll_no = ? ORDER BY id LIMIT 1",
+            (batch_name, str(roll_no))).fetchone()
+        return {'roll': row[0], 'name': row[1]} if row else None
+
+    # --- Attendance ---
+
+    def session_exists(self, attendance_date, batch_name):
+        return self._conn().execute(
+            "SELECT 1 FROM attendance WHERE batch = ? AND date = ? LIMIT 1",
+            (batch_name, attendance_date)).fetchone() is not None
+
+    def session_dates(self, batch_name):
+        rows = self._conn().execute("SELECT DISTINCT date FROM attendance WHERE batch = ? ORDER BY date",
+                                    (batch_name,))
+        return [row[0] for row in rows]
+
+    def has_attendance(self):
+        return self._conn().execute("SELECT 1 FROM attendance LIMIT 1").fetchone() is not None
+
+    def save_sessions(self, sessions, overwrite=False):
+        """
+        Saves (date, batch, df) sessions, df having roll_no/student_name/status
+        columns, in a single transaction. Sessions that already exist are
+        skipped unless overwrite is True. Returns a list of booleans (saved
+        or not, per session) and {batch: new revision} of the changed batches.
+        """
+        accepted, revisions = [], {}
+        with self._transaction() as conn:
+            for attendance_date, batch_name, df in sessions:
+                exists = conn.execute("SELECT 1 FROM attendance WHERE batch = ? AND date = ? LIMIT 1",
+                                      (batch_name, attendance_date)).fetchone() is not None
+                if exists and not overwrite:
+                    accepted.append(False)
+                    continue
+                if exists:
+                    conn.execute("DELETE FROM attendance WHERE batch = ? AND date = ?", (batch_name, attendance_date))
+                conn.executemany("INSERT INTO attendance (batch, date, roll_no, student_name, status) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                                 [(batch_name, attendance_date, str(roll_no), student_name, status)
+                                  for roll_no, student_name, status
+                                  in zip(df['roll_no'], df['student_name'], df['status'])])
+                accepted.append(True)
+                revisions[batch_name] = None
+            for batch_name in revisions:
+                revisions[batch_name] = self._bump(conn, batch_name)
+        return accepted, revisions
+
+    def import_attendance(self, df):
+        """Bulk-inserts live attendance rows (ATTENDANCE_COLUMNS) as they are."""
+        with self._transaction() as conn:
+            conn.executemany("INSERT INTO attendance (roll_no, student_name, status, date, batch) "
+                             "VALUES (?, ?, ?, ?, ?)", df[ATTENDANCE_COLUMNS].astype(str).itertuples(index=False))
+            for batch in pd.unique(df['batch']):
+                self._bump(conn, batch)
+
+    def load_rows(self, batch_name=None):
+        """Returns attendance rows in save order as a DataFrame of ATTENDANCE_COLUMNS."""
+        sql = "SELECT roll_no, student_name, status, date, batch FROM attendance"
+        params = ()
+        if batch_name is not None:
+            sql += " WHERE batch = ?"
+            params = (batch_name,)
+        rows = self._conn().execute(sql + " ORDER BY id", params).fetchall()
+        return pd.DataFrame(rows, columns=ATTENDANCE_COLUMNS, dtype=object)
+
+    def query_rows(self, batches=None, start_date=None, end_date=None, roll_nos=None):
+        """
+        Returns the attendance rows matching every given filter (None = no
+        filter; dates inclusive) in save order, as a DataFrame of ATTENDANCE_COLUMNS.
+        """
+        where, params = [], []
+        if batches is not None:
+            where.append(f"batch IN ({', '.join('?' * len(batches))})")
+            params.extend(batches)
+        if start_date is not None:
+            where.append("date >= ?")
+            params.append(start_date)
+        if end_date is not None:
+            where.append("date <= ?")
+            params.append(end_date)
+        if roll_nos is not None:
+            where.append(f"roll_no IN ({', '.join('?' * len(roll_nos))})")
+            params.extend(roll_nos)
+        sql = "SELECT roll_no, student_name, status, date, batch FROM attendance"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self._conn().execute(sql + " ORDER BY id", params).fetchall()
+        return pd.DataFrame(rows, columns=ATTENDANCE_COLUMNS, dtype=object)
+
+    def vacuum(self):
+        conn = self._conn()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+
+
+class _Transaction:
+    """Commits on success and rolls back on error."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,191 @@
+"""
+File formats for the attendance logs managed by data_manager.
+
+Every backend reads and writes the same logical table (ATTENDANCE_COLUMNS).
+Reads always hand back plain text columns, so the rest of the app does not
+care which format is on disk.
+
+* 'csv'     - the original text format. Supports cheap appends.
+* 'parquet' - columnar binary (needs pyarrow).
+* 'feather' - columnar binary, faster to read than parquet (needs pyarrow).
+
+The columnar formats store 'status' as a 1-byte code, roll numbers, names
+and batches as dictionary-encoded categoricals and 'date' as a real date.
+Columnar files cannot be appended to, so a save rewrites the file with
+overwrites already applied. This is best used together with the
+partitioned layout, where each file holds only one batch.
+
+Every backend can also hand a log out in chunks (read_chunks), so reports
+can be built without loading the whole history.
+"""
+import os
+from lazy_import import lazy_module
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+ATTENDANCE_COLUMNS = ['roll_no', 'student_name', 'status', 'date', 'batch']
+
+# 1-byte codes for the 'status' column of the columnar formats
+STATUS_CODES = {'Absent': 0, 'Present': 1}
+_STATUS_NAMES = sorted(STATUS_CODES, key=STATUS_CODES.get) # code -> status
+
+
+class CsvBackend:
+    """Plain CSV log. Appends never touch existing rows."""
+    name = 'csv'
+    extension = '.csv'
+    appendable = True
+
+    def read(self, path, usecols=None):
+        return pd.read_csv(path, dtype=str, usecols=usecols, keep_default_na=False)
+
+    def read_chunks(self, path, chunksize, usecols=None):
+        """Yields the log as DataFrames of at most chunksize rows, in file order."""
+        with pd.read_csv(path, dtype=str, usecols=usecols, keep_default_na=False, chunksize=chunksize) as reader:
+            yield from reader
+
+    def append(self, path, df):
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        columns = ATTENDANCE_COLUMNS
+        prefix = ''
+        if not write_header:
+            columns, ends_with_newline = self._inspect(path)
+            # A hand-edited log may lack the final newline; the new rows would
+            # be glued onto its last row
+            if not ends_with_newline:
+                prefix = '\n'
+        # One write call, flushed to disk before the caller releases its lock
+        text = prefix + df[columns].to_csv(header=write_header, index=False)
+        with open(path, 'a', newline='') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _inspect(path):
+        """
+        Returns the header columns of an existing log and whether it ends in a
+        newline. Raises ValueError if the header is not ATTENDANCE_COLUMNS (in
+        any order), since appended rows would not line up with it.
+        """
+        with open(path, 'rb') as f:
+            header = f.readline().decode('utf-8-sig').strip()
+            f.seek(-1, os.SEEK_END)
+            ends_with_newline = f.read(1) in (b'\n', b'\r')
+        columns = [col.strip().strip('"') for col in header.split(',')]
+        if sorted(columns) != sorted(ATTENDANCE_COLUMNS):
+            raise ValueError(f"{path} has the columns {columns}, expected {ATTENDANCE_COLUMNS}.")
+        return columns, ends_with_newline
+
+    def write(self, path, df):
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w', newline='') as f:
+            df[ATTENDANCE_COLUMNS].to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    def create(self, path):
+        """Creates an empty log (just the header) without importing pandas."""
+        with open(path, 'w') as f:
+            f.write(','.join(ATTENDANCE_COLUMNS) + '\n')
+
+
+class ArrowBackend:
+    """Parquet or Feather file with categorical encoding."""
+    appendable = False
+
+    def __init__(self, fmt):
+        self.name = fmt
+        self.extension = '.' + fmt
+
+    def _pyarrow(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError(f"The '{self.name}' storage backend requires pyarrow (pip install pyarrow).")
+        return pa
+
+    def _encode(self, df):
+        pa = self._pyarrow()
+        status = df['status'].map(STATUS_CODES)
+        if status.isna().any():
+            unknown = sorted(set(df.loc[status.isna(), 'status']))
+            raise ValueError(f"Cannot store status values {unknown} in the '{self.name}' backend.")
+        dates = pd.to_datetime(df['date'], format='%Y-%m-%d').to_numpy().astype('datetime64[D]')
+        return pa.table({
+            'roll_no': pa.array(df['roll_no'].astype(str).to_numpy(dtype=object)).dictionary_encode(),
+            'student_name': pa.array(df['student_name'].astype(str).to_numpy(dtype=object)).dictionary_encode(),
+            'status': pa.array(status.to_numpy(dtype=np.int8)),
+            'date': pa.array(dates),
+            'batch': pa.array(df['batch'].astype(str).to_numpy(dtype=object)).dictionary_encode(),
+        })
+
+    def _decode(self, table):
+        df = table.to_pandas(date_as_object=False)
+        if 'status' in df:
+            df['status'] = np.array(_STATUS_NAMES, dtype=object)[df['status'].to_numpy()]
+        if 'date' in df:
+            df['date'] = np.datetime_as_string(df['date'].to_numpy().astype('datetime64[D]'), unit='D')
+        for col in ('roll_no', 'student_name', 'batch'):
+            if col in df:
+                df[col] = df[col].astype(str)
+        return df
+
+    def read(self, path, usecols=None):
+        self._pyarrow()
+        if self.name == 'parquet':
+            import pyarrow.parquet as pq
+            table = pq.read_table(path, columns=usecols)
+        else:
+            import pyarrow.feather as feather
+            table = feather.read_table(path, columns=usecols)
+        return self._decode(table)
+
+    def read_chunks(self, path, chunksize, usecols=None):
+        """Yields the log as DataFrames of at most chunksize rows, in file order."""
+        pa = self._pyarrow()
+        if self.name == 'parquet':
+            import pyarrow.parquet as pq
+            batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=usecols)
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(path))
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            if usecols is not None:
+                batches = (batch.select(usecols) for batch in batches)
+        for batch in batches:
+            table = pa.Table.from_batches([batch])
+            for start in range(0, table.num_rows, chunksize):
+                yield self._decode(table.slice(start, chunksize))
+
+    def append(self, path, df):
+        raise NotImplementedError(f"The '{self.name}' backend cannot append, use write().")
+
+    def create(self, path):
+        self.write(path, pd.DataFrame(columns=ATTENDANCE_COLUMNS))
+
+    def write(self, path, df):
+        table = self._encode(df)
+        tmp_file = path + '.tmp'
+        if self.name == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp_file)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, tmp_file)
+        os.replace(tmp_file, path)
+
+
+BACKENDS = {
+    'csv': CsvBackend(),
+    'parquet': ArrowBackend('parquet'),
+    'feather': ArrowBackend('feather'),
+}
+
+def get_backend(name):
+    """Returns the backend registered under name."""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend '{name}'. Choose one of: {', '.join(BACKENDS)}.")
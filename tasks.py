@@ -0,0 +1,92 @@
+"""
+Background execution for slow work started from the Tk frames.
+
+Tk is single threaded, so TaskRunner runs jobs on a small thread pool and
+polls for their completion with after(); the on_done/on_error callbacks are
+therefore always called on the Tk main thread. Jobs are grouped by key: a
+new job for a key supersedes the previous one, and cancelled or superseded
+jobs never call back, even if they were already running.
+
+RefreshScheduler coalesces bursts of refresh triggers (expose events, quick
+tab switches) into one call on the Tk thread.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskRunner:
+    def __init__(self, widget, max_workers=2, poll_interval=50):
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="attendance-task")
+        self._jobs = {} # {key: future of the current job}
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None):
+        """Runs fn(*args) in the background, replacing any job under the same key."""
+        self.cancel(key)
+        future = self._executor.submit(fn, *args)
+        self._jobs[key] = future
+        self.widget.after(self.poll_interval, self._poll, key, future, on_done, on_error)
+        return future
+
+    def cancel(self, key):
+        """Drops the job under key. A job that already started finishes but is ignored."""
+        future = self._jobs.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def cancel_all(self):
+        for key in list(self._jobs):
+            self.cancel(key)
+
+    def is_pending(self, key):
+        return key in self._jobs
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self, key, future, on_done, on_error):
+        if self._jobs.get(key) is not future:
+            return # Cancelled or superseded
+        if not future.done():
+            self.widget.after(self.poll_interval, self._poll, key, future, on_done, on_error)
+            return
+
+        del self._jobs[key]
+        try:
+            result = future.result()
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
+            return
+        if on_done is not None:
+            on_done(result)
+
+
+class RefreshScheduler:
+    """
+    Runs refresh callbacks once per burst of requests. request(key, fn) within
+    delay_ms of an earlier request for the same key does not schedule another
+    call; the pending call runs the most recently requested fn.
+    """
+    def __init__(self, widget, delay_ms=30):
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self._pending = {} # {key: [after id, fn]}
+
+    def request(self, key, fn):
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending[1] = fn
+            return
+        after_id = self.widget.after(self.delay_ms, self._run, key)
+        self._pending[key] = [after_id, fn]
+
+    def cancel(self, key):
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self.widget.after_cancel(pending[0])
+
+    def _run(self, key):
+        _, fn = self._pending.pop(key)
+        fn()
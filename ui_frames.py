@@ -3,7 +3,10 @@ from tkinter import ttk, messagebox
 from datetime import date, datetime
 import data_manager
 import analytics
+import instrument
 import sys
+import bisect
+from tasks import RefreshScheduler, TaskRunner
 
 class WelcomeFrame(ttk.Frame):
     """The first frame the user sees."""
@@ -24,46 +27,120 @@ class WelcomeFrame(ttk.Frame):
 
 class BatchSelectFrame(ttk.Frame):
     """Frame for selecting a batch."""
+    BUTTON_COLUMNS = 3
+
     def __init__(self, parent, controller):
         ttk.Frame.__init__(self, parent)
         self.controller = controller
+        self.refresh = RefreshScheduler(self)
+        self.tasks = TaskRunner(self, max_workers=1)
+        self.buttons = {} # {batch name: button}, in grid order
+        self.roster_version = None # Roster version the buttons were built from
+        
+        label = ttk.Label(self, text="Please Select a Batch", style="Header.TLabel")
+        label.pack(pady=20)
+        self.button_frame = ttk.Frame(self)
+        self.button_frame.pack(pady=10)
+        # Low-attendance alerts, read from the alert book in the background
+        self.alerts_label = ttk.Label(self, text="", justify="center")
+        self.alerts_label.pack(pady=10)
+
+        # <Visibility> also fires on every expose event, so the refreshes are
+        # coalesced and skipped entirely while the roster is unchanged
         self.bind("<Visibility>", self.on_show)
         
     def on_show(self, event):
-        for widget in self.winfo_children():
-            widget.destroy()
+        self.refresh.request("batches", self.refresh_batches)
+        self.refresh.request("alerts", self.refresh_alerts)
 
-        label = ttk.Label(self, text="Please Select a Batch", style="Header.TLabel")
-        label.pack(pady=20)
+    def refresh_alerts(self):
+        self.tasks.submit("alerts", data_manager.get_alerts, on_done=self._show_alerts,
+                          on_error=lambda error: self.alerts_label.config(text=""))
+
+    def _show_alerts(self, result):
+        alerts, message = result
+        if not alerts:
+            self.alerts_label.config(text="")
+            return
+        per_batch = {}
+        for alert in alerts:
+            per_batch[alert['batch']] = per_batch.get(alert['batch'], 0) + 1
+        details = ", ".join(f"{batch}: {count}" for batch, count in per_batch.items())
+        self.alerts_label.config(text=f"\u26a0 {message}\n{details}")
+
+    def refresh_batches(self):
+        """Brings the batch buttons in line with the roster, touching only what changed."""
+        version = data_manager.get_roster_version()
+        if version == self.roster_version:
+            return
+        self.roster_version = version
 
         batches = data_manager.load_batches()
-        
-        button_frame = ttk.Frame(self)
-        button_frame.pack(pady=10)
+        batch_keys = list(batches.keys() if isinstance(batches, dict) else batches)
 
-        row, col = 0, 0
-        batch_keys = batches.keys() if isinstance(batches, dict) else batches
-        
+        old_order = list(self.buttons) # Before removals, so a gap left by one is re-gridded
+        for batch_name in set(self.buttons) - set(batch_keys):
+            self.buttons.pop(batch_name).destroy()
         for batch_name in batch_keys:
-            button = ttk.Button(button_frame, text=batch_name, 
-                                command=lambda b=batch_name: self.on_batch_select(b))
-            button.grid(row=row, column=col, padx=10, pady=10, ipadx=10, ipady=10, sticky="ew")
-            
-            col += 1
-            if col > 2:
-                col = 0
-                row += 1
+            if batch_name not in self.buttons:
+                self.buttons[batch_name] = ttk.Button(self.button_frame, text=batch_name,
+                                                      command=lambda b=batch_name: self.on_batch_select(b))
+        if old_order == batch_keys:
+            return
+
+        # Re-grid only the buttons whose position changed
+        for i, batch_name in enumerate(batch_keys):
+            row, col = divmod(i, self.BUTTON_COLUMNS)
+            button = self.buttons[batch_name]
+            info = button.grid_info()
+            if not info or (int(info['row']), int(info['column'])) != (row, col):
+                button.grid(row=row, column=col, padx=10, pady=10, ipadx=10, ipady=10, sticky="ew")
+        self.buttons = {batch_name: self.buttons[batch_name] for batch_name in batch_keys}
 
     def on_batch_select(self, batch_name):
         self.controller.current_batch = batch_name
         self.controller.show_frame("AttendanceFrame")
 
+def _report_if_changed(batch_name, shown):
+    """
+    Background job of the report tab. Returns (batch, data version) and the
+    get_report_data result, or None instead of the result if shown is current.
+    """
+    key = (batch_name, data_manager.get_data_version(batch_name))
+    if key == shown:
+        return key, None
+    return key, data_manager.get_report_data(batch_name)
+
+def _chart_if_changed(batch_name, size_px, page, shown):
+    """Background job of the chart tab, see _report_if_changed."""
+    key = (batch_name, data_manager.get_data_version(batch_name), size_px, page)
+    if key == shown:
+        return key, None
+    return key, analytics.load_analytics_chart(batch_name, size_px, page)
+
 class AttendanceFrame(ttk.Frame):
     """The main frame for taking attendance."""
     def __init__(self, parent, controller):
         ttk.Frame.__init__(self, parent)
         self.controller = controller
-        self.student_vars = {} # {roll_no: {'name': name, 'var': var}}
+        # Students of the open batch and their checkbox state, one int per student.
+        # Only a small pool of row widgets exists; see _layout_rows().
+        self.students = []
+        self.checked = []
+        self.roster_index = None # data_manager.get_roster_index of the open batch
+        self.view = []           # Positions in self.students shown by the search filter
+        self.row_pool = []
+        self.row_height = None
+        self._scrollregion = None
+        self._in_layout = False
+        # Report and chart are generated off the Tk thread
+        self.tasks = TaskRunner(self)
+        self.refresh = RefreshScheduler(self)
+        self.chart_page = None # Page of the large-batch chart, None = overview
+        # What the report and chart tabs currently show, as (batch, data
+        # version[, size, page]); a tab is only regenerated when this changes
+        self.report_shown = None
+        self.chart_shown = None
         self.current_batch = None
         
         top_frame = ttk.Frame(self)
@@ -102,32 +179,50 @@ class AttendanceFrame(ttk.Frame):
         # Bind tab changes to a function that refreshes content
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_change)
 
-        # --- Setup for Scrollable Frame (now inside the 'attendance_tab') ---
+        # --- Setup for Scrollable List (now inside the 'attendance_tab') ---
         self.canvas = tk.Canvas(self.attendance_tab, background="#f0f0f0", highlightthickness=0)
         self.scrollbar = ttk.Scrollbar(self.attendance_tab, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
 
-        # Binding 1: Jab bhi inner frame ka size badle, scroll region update karo
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(
-                scrollregion=self.canvas.bbox("all")
-            )
-        )
+        # Search filter and roll number quick toggle, above the list
+        search_frame = ttk.Frame(self.attendance_tab)
+        search_frame.pack(fill="x", padx=10, pady=(8, 0))
+        ttk.Label(search_frame, text="Search:").pack(side="left")
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self._apply_filter())
+        ttk.Entry(search_frame, textvariable=self.search_var, width=25).pack(side="left", padx=5)
+        self.toggle_entry = ttk.Entry(search_frame, width=10)
+        self.toggle_entry.pack(side="right", padx=5)
+        self.toggle_entry.bind("<Return>", self.toggle_roll)
+        ttk.Label(search_frame, text="Toggle Roll No.:").pack(side="right")
+        self.filter_label = ttk.Label(search_frame)
+        self.filter_label.pack(side="left", padx=10)
+
+        # --- SPACIOUS LAYOUT ---
+        # The header sits above the canvas so it stays visible while scrolling
+        self.header_frame = ttk.Frame(self.attendance_tab)
+        ttk.Label(self.header_frame, text="Roll No.", style="Header.TLabel", width=15).pack(side="left", padx=5)
+        ttk.Label(self.header_frame, text="Student Name", style="Header.TLabel").pack(side="left", padx=5)
+        ttk.Label(self.header_frame, text="Present", style="Header.TLabel").pack(side="right", padx=20)
+
+        self.empty_label = ttk.Label(self.canvas, text="No students found for this batch.")
+        self.empty_window = self.canvas.create_window((0, 0), window=self.empty_label, anchor="nw", state="hidden")
 
-        # scrollable_frame ko canvas ke andar daalo
-        self.canvas_window = self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+        # Every scroll (scrollbar, mouse wheel, yview_moveto) goes through here,
+        # so the row pool is rebound to the students that became visible.
+        def on_canvas_scroll(first, last):
+            self.scrollbar.set(first, last)
+            self._layout_rows()
 
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=on_canvas_scroll)
 
-        # --- YEH SCROLLBAR KO FIX KAREGA ---
-        # Binding 2: Jab bhi canvas ka size badle (jaise window resize),
-        # inner frame ki width ko canvas ki width ke barabar kar do.
+        # Jab bhi canvas ka size badle (jaise window resize), rows ki width
+        # canvas ke barabar karo aur pool ko naye height ke hisaab se bharo.
         def on_canvas_configure(event):
-            self.canvas.itemconfig(self.canvas_window, width=event.width)
-        
+            for row in self.row_pool:
+                self.canvas.itemconfig(row['window'], width=max(1, event.width - 20))
+            self._layout_rows()
+
         self.canvas.bind("<Configure>", on_canvas_configure)
-        # --- END OF SCROLLBAR FIX ---
 
         # Touchpad/Mouse wheel scrolling
         self.canvas.bind('<Enter>', self._bind_mousewheel)
@@ -154,55 +249,170 @@ class AttendanceFrame(ttk.Frame):
         deselect_all_button.pack(side="left", padx=5)
 
     def refresh_student_list(self, batch_name):
+        with instrument.span('refresh_student_list', batch=batch_name) as sp:
+            self._refresh_student_list(batch_name)
+            sp.set(rows=len(self.students))
+
+    def _refresh_student_list(self, batch_name):
+        # Results for the previous batch are no longer wanted
+        self.tasks.cancel_all()
         self.current_batch = batch_name
+        self.chart_page = None
         self.title_label.config(text=f"Mark Attendance for: {batch_name}")
         
         # Switch to the first tab whenever a new batch is selected
         self.notebook.select(self.attendance_tab)
 
-        # Clear old student list
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        self.student_vars.clear()
-
-        students = data_manager.get_students(batch_name)
-        if not students:
-            ttk.Label(self.scrollable_frame, text="No students found for this batch.").pack()
+        # Reset the list state; the row widgets themselves are reused
+        with instrument.span('students.roster'):
+            self.roster_index = data_manager.get_roster_index(batch_name)
+        self.students = self.roster_index.students
+        self.checked = [0] * len(self.students)
+        for row in self.row_pool:
+            row['index'] = None
+        self.toggle_entry.delete(0, "end")
+
+        if not self.students:
+            self.header_frame.pack_forget()
+        else:
+            self.header_frame.pack(fill='x', padx=10, pady=5, before=self.scrollbar)
+
+        # Clearing the search shows every student (see _apply_filter)
+        self.search_var.set("")
+
+    def _apply_filter(self):
+        """Shows the students matching the search box. Only the view changes, not the rows."""
+        with instrument.span('students.filter') as sp:
+            self._filter_rows()
+            sp.set(rows=len(self.view))
+
+    def _filter_rows(self):
+        query = self.search_var.get()
+        self.view = self.roster_index.search(query) if self.roster_index is not None else []
+        if not self.students:
+            self.empty_label.config(text="No students found for this batch.")
+        elif not self.view:
+            self.empty_label.config(text="No students match the search.")
+        self.canvas.itemconfig(self.empty_window, state="hidden" if self.view else "normal")
+        self.filter_label.config(text=f"{len(self.view)} of {len(self.students)} students" if query.strip() else "")
+
+        self.canvas.yview_moveto(0)
+        self._layout_rows()
+
+    def toggle_roll(self, event=None):
+        """Flips the checkbox of the student whose roll number was typed, for marking by keyboard."""
+        roll_no = self.toggle_entry.get().strip()
+        if not roll_no or self.roster_index is None:
+            return
+        positions = self.roster_index.find_roll(roll_no)
+        if not positions:
+            self.filter_label.config(text=f"No student with Roll No. {roll_no}.")
+            self.bell()
+            return
+        for index in positions:
+            self.checked[index] = 0 if self.checked[index] else 1
+        student = self.students[positions[0]]
+        status = 'Present' if self.checked[positions[0]] else 'Absent'
+        self.filter_label.config(text=f"{student['roll']} {student['name']}: {status}")
+        self.toggle_entry.delete(0, "end")
+        self._scroll_to(positions[0])
+        self._layout_rows()
+
+    def _scroll_to(self, index):
+        """Scrolls the list so that student index is in view, if the filter shows it."""
+        pos = bisect.bisect_left(self.view, index)
+        if self.row_height is None or pos == len(self.view) or self.view[pos] != index:
+            return
+        top = pos * self.row_height
+        first = self.canvas.canvasy(0)
+        if top < first or top + self.row_height > first + self.canvas.winfo_height():
+            self.canvas.yview_moveto(top / (len(self.view) * self.row_height + 10))
+
+    def _make_row(self):
+        """Creates one reusable row (roll, name, checkbox) in the canvas."""
+        row_frame = ttk.Frame(self.canvas)
+        label_roll = ttk.Label(row_frame, width=15)
+        label_roll.pack(side="left", padx=5)
+        label_name = ttk.Label(row_frame)
+        label_name.pack(side="left", padx=5)
+
+        row = {'frame': row_frame, 'roll': label_roll, 'name': label_name,
+               'var': tk.IntVar(value=0), 'index': None}
+        cb = tk.Checkbutton(row_frame, variable=row['var'],
+                            command=lambda: self._on_row_toggle(row))
+        cb.pack(side="right", padx=15)
+        row['window'] = self.canvas.create_window(
+            (10, 0), window=row_frame, anchor="nw",
+            width=max(1, self.canvas.winfo_width() - 20), state="hidden")
+        return row
+
+    def _on_row_toggle(self, row):
+        if row['index'] is not None:
+            self.checked[row['index']] = row['var'].get()
+
+    def _layout_rows(self):
+        """
+        Binds the row pool to the students currently in view. The pool only
+        grows to what fits in the canvas, so big batches cost the same widgets
+        as small ones.
+        """
+        # Measuring the first row runs idle callbacks, which may scroll and call us again
+        if self._in_layout:
+            return
+        self._in_layout = True
+        try:
+            self._bind_rows()
+        finally:
+            self._in_layout = False
+
+    def _bind_rows(self):
+        if not self.view:
+            for row in self.row_pool:
+                self.canvas.itemconfig(row['window'], state="hidden")
+                row['index'] = None
             return
 
-        # --- SPACIOUS LAYOUT ---
-        header_frame = ttk.Frame(self.scrollable_frame)
-        header_frame.pack(fill='x', padx=10, pady=5) # Padding badha di
-        ttk.Label(header_frame, text="Roll No.", style="Header.TLabel", width=15).pack(side="left", padx=5)
-        ttk.Label(header_frame, text="Student Name", style="Header.TLabel").pack(side="left", padx=5) # Padding add ki
-        ttk.Label(header_frame, text="Present", style="Header.TLabel").pack(side="right", padx=20) # Padding badha di
-        
-        for student in students:
-            roll_no = student['roll']
-            name = student['name']
-            
-            var = tk.IntVar(value=0)
-            self.student_vars[roll_no] = {'name': name, 'var': var}
-            
-            # --- SPACIOUS LAYOUT ---
-            row_frame = ttk.Frame(self.scrollable_frame)
-            row_frame.pack(fill="x", padx=10, pady=5) # Padding badha di
-            
-            label_roll = ttk.Label(row_frame, text=roll_no, width=15)
-            label_roll.pack(side="left", padx=5)
-            label_name = ttk.Label(row_frame, text=name)
-            label_name.pack(side="left", padx=5) # Padding add ki
-            
-            # ... (refresh_student_list ka baaki code) ...
-            cb = tk.Checkbutton(row_frame, variable=var)
-            cb.pack(side="right", padx=15) # <-- Is line ko aise theek karein
+        if self.row_height is None:
+            self.row_pool.append(self._make_row())
+            self.row_pool[0]['roll'].config(text="0")
+            self.update_idletasks()
+            # --- SPACIOUS LAYOUT --- 5px padding above and below each row
+            self.row_height = self.row_pool[0]['frame'].winfo_reqheight() + 10
+
+        # Only touch the scroll region when it changes, since setting it
+        # triggers another yscrollcommand
+        scrollregion = (0, 0, 0, len(self.view) * self.row_height + 10)
+        if scrollregion != self._scrollregion:
+            self._scrollregion = scrollregion
+            self.canvas.configure(scrollregion=scrollregion)
+        first = max(0, int(self.canvas.canvasy(0) // self.row_height))
+        needed = self.canvas.winfo_height() // self.row_height + 2
+        while len(self.row_pool) < needed:
+            self.row_pool.append(self._make_row())
+
+        for offset, row in enumerate(self.row_pool):
+            pos = first + offset
+            if pos >= len(self.view):
+                self.canvas.itemconfig(row['window'], state="hidden")
+                row['index'] = None
+                continue
+            index = self.view[pos]
+            if row['index'] != index:
+                student = self.students[index]
+                row['roll'].config(text=student['roll'])
+                row['name'].config(text=student['name'])
+                row['index'] = index
+            row['var'].set(self.checked[index])
+            self.canvas.coords(row['window'], 10, pos * self.row_height + 5)
+            self.canvas.itemconfig(row['window'], state="normal")
 
     # YAHAN SE UNINDENT KAREIN (refresh_student_list ke level par)
     def save_attendance(self):
         # ... (Yeh function poora same hai, koi change nahi) ...
         attendance_date = self.date_entry.get()
         try:
-            datetime.strptime(attendance_date, "%Y-%m-%d")
+            # data_manager only takes zero-padded dates: '2024-1-5' is saved as '2024-01-05'
+            attendance_date = datetime.strptime(attendance_date.strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
         except ValueError:
             messagebox.showerror("Invalid Date", 
                                  "Invalid date format.\nPlease use YYYY-MM-DD.")
@@ -213,11 +423,11 @@ class AttendanceFrame(ttk.Frame):
             return
 
         records = []
-        for roll_no, data in self.student_vars.items():
-            status = 'Present' if data['var'].get() == 1 else 'Absent'
+        for student, checked in zip(self.students, self.checked):
+            status = 'Present' if checked == 1 else 'Absent'
             records.append({
-                'roll_no': roll_no,
-                'student_name': data['name'],
+                'roll_no': student['roll'],
+                'student_name': student['name'],
                 'status': status
             })
         
@@ -238,23 +448,80 @@ class AttendanceFrame(ttk.Frame):
             messagebox.showerror("Error", f"An error occurred: {e}")
 
     def on_tab_change(self, event):
-        """Called when the user switches tabs. Generates content on demand."""
+        """
+        Called when the user switches tabs. Quick switches are coalesced
+        into one refresh of the tab the user ends up on.
+        """
+        self.refresh.request("tab", self.refresh_current_tab)
+
+    def refresh_current_tab(self):
+        """
+        Regenerates the report or chart tab in the background, unless it
+        already shows the current data of the batch. Content of the same
+        batch stays visible (no loading screen) until the new one is ready.
+        """
         selected_tab = self.notebook.index(self.notebook.select())
+        batch_name = self.current_batch
 
         if selected_tab == 1: # Detailed Report tab
-            analytics.create_detailed_report(self.report_tab, self.current_batch)
+            self.tasks.cancel("chart")
+            if not self.report_shown or self.report_shown[0] != batch_name:
+                analytics.show_loading(self.report_tab, "Loading report...")
+            self.tasks.submit(
+                "report", _report_if_changed, batch_name, self.report_shown,
+                on_done=self._show_report,
+                on_error=self._report_failed)
         elif selected_tab == 2: # Analytics Chart tab
-            analytics.create_analytics_chart(self.chart_tab, self.current_batch)
+            self.tasks.cancel("report")
+            self.load_chart(self.chart_page)
+        else:
+            self.tasks.cancel_all()
+
+    def _show_report(self, result):
+        shown, report = result
+        if report is not None: # None: what is on screen is still current
+            self.report_shown = shown
+            analytics.show_detailed_report(self.report_tab, shown[0], *report)
+
+    def _report_failed(self, error):
+        self.report_shown = None
+        analytics.show_error(self.report_tab, f"Error generating report: {error}")
+
+    def load_chart(self, page):
+        """Renders the chart (or one page of it, for large batches) in the background."""
+        self.chart_page = page
+        batch_name = self.current_batch
+        # All tabs share one size, and the first tab has always been laid out
+        # (the chart tab may not have been yet)
+        size_px = analytics.chart_size_for(self.attendance_tab)
+        if not self.chart_shown or self.chart_shown[0] != batch_name or self.chart_shown[2:] != (size_px, page):
+            analytics.show_loading(self.chart_tab, "Drawing chart...")
+        self.tasks.submit(
+            "chart", _chart_if_changed, batch_name, size_px, page, self.chart_shown,
+            on_done=self._show_chart,
+            on_error=self._chart_failed)
+
+    def _show_chart(self, result):
+        shown, chart = result
+        if chart is not None:
+            # The page asked for may be gone (the roster shrank); keep what was drawn
+            self.chart_page = chart[3]
+            self.chart_shown = shown[:3] + (chart[3],)
+            analytics.show_analytics_chart(self.chart_tab, *chart, on_page=self.load_chart)
+
+    def _chart_failed(self, error):
+        self.chart_shown = None
+        analytics.show_error(self.chart_tab, f"Could not generate chart: {error}")
 
     def select_all(self):
         """Sets all student checkboxes to checked (Present)."""
-        for data in self.student_vars.values():
-            data['var'].set(1)
+        self.checked = [1] * len(self.students)
+        self._layout_rows()
 
     def deselect_all(self):
         """Sets all student checkboxes to unchecked (Absent)."""
-        for data in self.student_vars.values():
-            data['var'].set(0)
+        self.checked = [0] * len(self.students)
+        self._layout_rows()
 
     # --- YEH NAYA SCROLL FUNCTION HAI (ERROR FIXED) ---
     
@@ -287,3 +554,58 @@ class AttendanceFrame(ttk.Frame):
         self.canvas.unbind_all("<MouseWheel>")
         self.canvas.unbind_all("<Button-4>")
         self.canvas.unbind_all("<Button-5>")
+
+
+class DebugOverlay(tk.Toplevel):
+    """
+    Window listing the timing spans of the latest operations, newest first
+    (see instrument.py). Instrumentation is switched on while it is open,
+    unless it was already on. F12 in the main window opens and closes it.
+    """
+    REFRESH_MS = 500
+
+    def __init__(self, controller):
+        tk.Toplevel.__init__(self, controller)
+        self.title("Timings")
+        self.geometry("700x450")
+        self.owns_instrumentation = not instrument.is_enabled()
+        instrument.enable()
+        self.generation = None
+
+        bar = ttk.Frame(self)
+        bar.pack(fill="x", padx=5, pady=5)
+        self.memory_var = tk.IntVar(value=0)
+        ttk.Checkbutton(bar, text="Track memory (slower)", variable=self.memory_var,
+                        command=lambda: instrument.enable(memory=bool(self.memory_var.get()))).pack(side="left")
+        ttk.Button(bar, text="Clear", command=instrument.clear).pack(side="right")
+
+        self.text = tk.Text(self, wrap="none", font=("Courier", 10), state="disabled")
+        scroll_y = ttk.Scrollbar(self, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=scroll_y.set)
+        scroll_y.pack(side="right", fill="y")
+        self.text.pack(fill="both", expand=True)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self._refresh()
+
+    def _refresh(self):
+        generation, spans = instrument.recent()
+        if generation != self.generation:
+            self.generation = generation
+            lines = []
+            for root in reversed(spans):
+                lines.extend(instrument.format_span(root))
+                lines.append("")
+            self.text.config(state="normal")
+            self.text.delete("1.0", "end")
+            self.text.insert("1.0", "\n".join(lines) or "Nothing recorded yet.")
+            self.text.config(state="disabled")
+        self._after = self.after(self.REFRESH_MS, self._refresh)
+
+    def close(self):
+        self.after_cancel(self._after)
+        if self.owns_instrumentation:
+            instrument.disable()
+        elif self.memory_var.get():
+            instrument.enable(memory=False)
+        self.destroy()